@@ -0,0 +1,226 @@
+"""
+Shared PostgreSQL connection pool for the MCP analytics tools.
+
+Both main.py and energy_server.py borrow connections from one
+size-bounded psycopg2 pool per process instead of opening (and never
+closing) a new connection on every tool call:
+
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            ...
+
+The block commits on success, rolls back on error and always returns the
+connection to the pool. Connections that sat idle longer than
+DB_HEALTH_CHECK_INTERVAL are pinged before being handed out, and broken
+ones are replaced.
+
+Code running on the event loop (the MCP tools) uses the async helpers
+fetch_all()/fetch_one() instead: the query runs on a dedicated, bounded
+thread pool with a per-statement timeout, so a slow analytic query can
+neither block the loop nor hold a connection indefinitely.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extras import RealDictCursor
+
+DB_CONFIG = {
+    "dbname": os.getenv("PG_DATABASE", "mydatabase"),
+    "user": os.getenv("PG_USER", "postgres"),
+    "password": os.getenv("PG_PASSWORD", "lou"),
+    "host": os.getenv("PG_HOST", "127.0.0.1"),
+    "port": os.getenv("PG_PORT", "5432")
+}
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+# Seconds a caller waits for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+# Connections idle for longer than this are checked with SELECT 1 on checkout
+DB_HEALTH_CHECK_INTERVAL = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", 30))
+# Server-side limit for each query run through run_query()/fetch_*()
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 5000))
+# Threads running queries for async callers; more than the pool size would
+# only make them wait for a connection
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", DB_POOL_MAX))
+
+
+class PoolTimeout(Exception):
+    """No connection became free within DB_POOL_TIMEOUT"""
+
+
+class ConnectionPool:
+    """
+    psycopg2's ThreadedConnectionPool raises as soon as it is exhausted;
+    this wraps it with a semaphore so callers queue (up to a timeout) for
+    one of max_size connections, and adds checkout health checks.
+    """
+
+    def __init__(self, config=DB_CONFIG, min_size=DB_POOL_MIN, max_size=DB_POOL_MAX,
+                 timeout=DB_POOL_TIMEOUT, health_check_interval=DB_HEALTH_CHECK_INTERVAL):
+        self.config = config
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._pool = pool.ThreadedConnectionPool(min_size, max_size, **config)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._last_used = {}  # id(conn) -> time it was returned
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.replaced = 0
+        self.timeouts = 0
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.time() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No database connection free after {self.timeout}s "
+                              f"(pool size {self.max_size})")
+        try:
+            conn = self._pool.getconn()
+            # After a database restart every idle connection may be dead
+            while not self._healthy(conn):
+                self._discard(conn)
+                with self._lock:
+                    self.replaced += 1
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+        return conn
+
+    def putconn(self, conn):
+        try:
+            if conn.closed:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.time()
+                self._pool.putconn(conn)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def close(self):
+        self._pool.closeall()
+        self._last_used.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "replaced": self.replaced,
+                "timeouts": self.timeouts,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The process-wide pool, created on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+                print(f"[DB] Connection pool ready (max {_pool.max_size})")
+    return _pool
+
+
+@contextmanager
+def get_db_connection():
+    """Borrow a pooled connection; commits on success, rolls back on error."""
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass  # connection is broken; putconn() drops it
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+
+def run_query(query, params=None, one=False, timeout_ms=DB_STATEMENT_TIMEOUT_MS):
+    """Run a read query with a statement timeout; returns dict rows (or one row)."""
+    with get_db_connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            # SET LOCAL only lasts for this transaction, so pooled
+            # connections go back with the server default
+            cur.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+            cur.execute(query, params)
+            return cur.fetchone() if one else cur.fetchall()
+
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS,
+                                               thread_name_prefix="db-query")
+    return _executor
+
+
+async def fetch_all(query, params=None, timeout_ms=DB_STATEMENT_TIMEOUT_MS):
+    """run_query() on the database thread pool, awaitable from the event loop"""
+    call = functools.partial(run_query, query, params, False, timeout_ms)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), call)
+
+
+async def fetch_one(query, params=None, timeout_ms=DB_STATEMENT_TIMEOUT_MS):
+    call = functools.partial(run_query, query, params, True, timeout_ms)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), call)
+
+
+def close_pool():
+    global _pool, _executor
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
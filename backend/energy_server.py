@@ -1,6 +1,5 @@
 import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from database import close_pool, fetch_all, fetch_one
 from mcp.server.fastmcp import FastMCP
 from datetime import date, datetime
 
@@ -14,17 +13,9 @@ import uvicorn
 mcp = FastMCP("EnergyDatabase")
 
 # --- 2. DATABASE CONFIGURATION ---
-DB_CONFIG = {
-    "dbname": "mydatabase",
-    "user": "postgres",
-    "password": "lou",
-    "host": "127.0.0.1",
-    "port": "5432"
-}
-
-def get_db_connection():
-    """Establishes a connection to the PostgreSQL database."""
-    return psycopg2.connect(**DB_CONFIG)
+# Connection settings (PG_* env vars), the shared pool and the query thread
+# pool live in database.py. Tools await fetch_all()/fetch_one(), which run
+# each query off the event loop with a statement timeout.
 
 def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
@@ -36,40 +27,38 @@ def json_serial(obj):
 # These remain exactly the same as your original script
 
 @mcp.tool()
-def get_waste_summary_by_location(start_date: str, end_date: str) -> str:
+async def get_waste_summary_by_location(start_date: str, end_date: str) -> str:
     """
     Generates a financial report of energy waste grouped by location/room.
     Use this when the user asks "Which room is costing me the most?"
     
     Args:
         start_date: 'YYYY-MM-DD'
-        end_date: 'YYYY-MM-DD'
+        end_date: 'YYYY-MM-DD' (inclusive)
+    Days are local calendar days (the rollups' time zone, Asia/Manila).
     """
     query = """
         SELECT 
             l.name AS location_name,
-            COUNT(we.event_id) AS total_events,
-            SUM(we.duration_hours) AS total_hours_wasted,
-            SUM(we.kwh_consumed) AS total_kwh,
-            SUM(we.estimated_cost_php) AS total_cost_php
-        FROM waste_events we
-        JOIN device_catalog dc ON we.device_id = dc.device_id
+            SUM(r.event_count)::bigint AS total_events,
+            SUM(r.total_hours) AS total_hours_wasted,
+            SUM(r.total_kwh) AS total_kwh,
+            SUM(r.total_cost_php) AS total_cost_php
+        FROM waste_rollup_daily r
+        JOIN device_catalog dc ON r.device_id = dc.device_id
         JOIN locations l ON dc.location_id = l.location_id
-        WHERE we.detection_timestamp::date BETWEEN %s AND %s
+        WHERE r.bucket_date >= %s AND r.bucket_date < %s::date + 1
         GROUP BY l.name
         ORDER BY total_cost_php DESC
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (start_date, end_date))
-                results = cur.fetchall()
-                return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
+        results = await fetch_all(query, (start_date, end_date))
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_top_offending_devices(limit: int = 5) -> str:
+async def get_top_offending_devices(limit: int = 5) -> str:
     """
     Identifies specific devices that are the worst offenders for energy waste.
     Includes technical specs (wattage) to explain high costs.
@@ -82,55 +71,52 @@ def get_top_offending_devices(limit: int = 5) -> str:
             dc.device_name,
             l.name AS location,
             dc.avg_wattage_rating AS wattage,
-            COUNT(we.event_id) AS waste_frequency,
-            SUM(we.estimated_cost_php) AS total_cost_php
-        FROM waste_events we
-        JOIN device_catalog dc ON we.device_id = dc.device_id
+            SUM(r.event_count)::bigint AS waste_frequency,
+            SUM(r.total_cost_php) AS total_cost_php
+        FROM waste_rollup_daily r
+        JOIN device_catalog dc ON r.device_id = dc.device_id
         JOIN locations l ON dc.location_id = l.location_id
         GROUP BY dc.device_name, l.name, dc.avg_wattage_rating
         ORDER BY total_cost_php DESC
         LIMIT %s
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (limit,))
-                results = cur.fetchall()
-                return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
+        results = await fetch_all(query, (limit,))
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_waste_heatmap_by_hour() -> str:
+async def get_waste_heatmap_by_hour() -> str:
     """
     Analyzes time-of-day patterns to find when waste usually occurs.
     Essential for 'Prescriptive' analytics (e.g., "You leave lights on at 6 PM").
     """
     query = """
         SELECT 
-            EXTRACT(HOUR FROM we.detection_timestamp) AS hour_of_day,
-            COUNT(we.event_id) AS incident_count,
-            SUM(we.estimated_cost_php) AS total_cost_php
-        FROM waste_events we
+            EXTRACT(HOUR FROM r.bucket_start) AS hour_of_day,
+            SUM(r.event_count)::bigint AS incident_count,
+            SUM(r.total_cost_php) AS total_cost_php
+        FROM waste_rollup_hourly r
         GROUP BY hour_of_day
         ORDER BY total_cost_php DESC
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query)
-                results = cur.fetchall()
-                data = json.dumps([dict(r) for r in results], default=json_serial)
-                return f"Hourly Waste Analysis (0-23 hour format):\n{data}"
+        results = await fetch_all(query)
+        data = json.dumps([dict(r) for r in results], default=json_serial)
+        return f"Hourly Waste Analysis (0-23 hour format):\n{data}"
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_confidence_check(threshold: float = 0.8) -> str:
+async def get_confidence_check(threshold: float = 0.8, days: int = None) -> str:
     """
     Audits the system's performance. Returns events where the Computer Vision
     model was unsure (low confidence), but waste was logged anyway.
+    Pass `days` to look at the last N days only (default: all time).
     """
+    if days is not None and days <= 0:
+        return "Error: days must be a positive number of days, or omitted for all time."
     query = """
         SELECT 
             we.event_id,
@@ -140,22 +126,21 @@ def get_confidence_check(threshold: float = 0.8) -> str:
         FROM waste_events we
         JOIN device_catalog dc ON we.device_id = dc.device_id
         WHERE we.confidence_score < %s
+          AND (%s::int IS NULL OR we.detection_timestamp >= NOW() - make_interval(days => %s))
+          AND we.detection_timestamp < NOW()
         ORDER BY we.confidence_score ASC
         LIMIT 10
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (threshold,))
-                results = cur.fetchall()
-                if not results:
-                    return "No low-confidence detections found. System is healthy."
-                return json.dumps([dict(r) for r in results], default=json_serial)
+        results = await fetch_all(query, (threshold, days, days))
+        if not results:
+            return "No low-confidence detections found. System is healthy."
+        return json.dumps([dict(r) for r in results], default=json_serial)
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_devices_by_location(location_name: str) -> str:
+async def get_devices_by_location(location_name: str) -> str:
     """
     Lists all devices in a specific room and their individual waste contribution.
     Use this when a user asks "Why is the [Room Name] so expensive?"
@@ -164,73 +149,67 @@ def get_devices_by_location(location_name: str) -> str:
         SELECT 
             dc.device_name,
             dc.avg_wattage_rating,
-            COUNT(we.event_id) as events,
-            SUM(we.estimated_cost_php) as total_cost
-        FROM waste_events we
-        JOIN device_catalog dc ON we.device_id = dc.device_id
+            SUM(r.event_count)::bigint as events,
+            SUM(r.total_cost_php) as total_cost
+        FROM waste_rollup_daily r
+        JOIN device_catalog dc ON r.device_id = dc.device_id
         JOIN locations l ON dc.location_id = l.location_id
         WHERE l.name ILIKE %s  -- Case-insensitive match
         GROUP BY dc.device_name, dc.avg_wattage_rating
         ORDER BY total_cost DESC
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (f"%{location_name}%",))
-                results = cur.fetchall()
-                if not results:
-                    return f"No devices found for location: {location_name}"
-                return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
+        results = await fetch_all(query, (f"%{location_name}%",))
+        if not results:
+            return f"No devices found for location: {location_name}"
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error: {str(e)}"
     
 @mcp.tool()
-def get_weekly_trend_comparison() -> str:
+async def get_weekly_trend_comparison() -> str:
     """
     Compares this week's total waste cost vs. last week's.
     Returns a percentage change. Use for 'progress' or 'trend' questions.
     """
     query = """
         WITH this_week AS (
-            SELECT SUM(estimated_cost_php) as cost 
-            FROM waste_events 
-            WHERE detection_timestamp >= NOW() - INTERVAL '7 days'
+            SELECT SUM(total_cost_php) as cost 
+            FROM waste_rollup_hourly 
+            WHERE bucket_start >= date_trunc('hour', NOW() - INTERVAL '7 days')
         ),
         last_week AS (
-            SELECT SUM(estimated_cost_php) as cost 
-            FROM waste_events 
-            WHERE detection_timestamp >= NOW() - INTERVAL '14 days' 
-            AND detection_timestamp < NOW() - INTERVAL '7 days'
+            SELECT SUM(total_cost_php) as cost 
+            FROM waste_rollup_hourly 
+            WHERE bucket_start >= date_trunc('hour', NOW() - INTERVAL '14 days') 
+            AND bucket_start < date_trunc('hour', NOW() - INTERVAL '7 days')
         )
         SELECT 
             COALESCE((SELECT cost FROM this_week), 0) as current_week_cost,
             COALESCE((SELECT cost FROM last_week), 0) as previous_week_cost
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query)
-                res = cur.fetchone()
-                curr = float(res['current_week_cost'])
-                prev = float(res['previous_week_cost'])
-                
-                diff = curr - prev
-                if prev > 0:
-                    percent = (diff / prev) * 100
-                else:
-                    percent = 100 if curr > 0 else 0
-                
-                return json.dumps({
-                    "status": "worse" if diff > 0 else "better",
-                    "current_week_php": curr,
-                    "previous_week_php": prev,
-                    "change_percent": round(percent, 2)
-                })
+        res = await fetch_one(query)
+        curr = float(res['current_week_cost'])
+        prev = float(res['previous_week_cost'])
+        
+        diff = curr - prev
+        if prev > 0:
+            percent = (diff / prev) * 100
+        else:
+            percent = 100 if curr > 0 else 0
+        
+        return json.dumps({
+            "status": "worse" if diff > 0 else "better",
+            "current_week_php": curr,
+            "previous_week_php": prev,
+            "change_percent": round(percent, 2)
+        })
     except Exception as e:
         return f"Error: {str(e)}"
     
 @mcp.tool()
-def get_recent_logs(limit: int = 5) -> str:
+async def get_recent_logs(limit: int = 5) -> str:
     """
     Fetches the raw log of the most recent waste detection events.
     Use this if the user asks "What just happened?" or "Show me the latest alerts."
@@ -248,10 +227,8 @@ def get_recent_logs(limit: int = 5) -> str:
         LIMIT %s
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (limit,))
-                return json.dumps([dict(r) for r in cur.fetchall()], default=json_serial, indent=2)
+        results = await fetch_all(query, (limit,))
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error: {str(e)}"
     
@@ -269,6 +246,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("shutdown")
+def shutdown_event():
+    close_pool()
+
 # Use the correct method to create the ASGI app for SSE
 # Try 'sse_app()' first, if that fails, we use the manual mount approach
 try:
@@ -1,13 +1,15 @@
 import json
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from database import get_pool, close_pool, fetch_all, fetch_one
+from tool_cache import tool_cache
 from mcp.server.fastmcp import FastMCP
 from datetime import date, datetime
 import sys
 from pathlib import Path
 
 # FastAPI and middleware
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
@@ -15,27 +17,28 @@ import uvicorn
 import socketio
 import signal
 import base64
-import redis
+import redis.asyncio as aioredis
 import asyncio
 import os
+import threading
 import cv2
 
 # Import video detection
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from model.detection import get_frame as get_video_frame
+from model.detection import grab_frame, retrieve_frame, analyze_frame
+from model.detection import default_room, describe_detections, warmup as warmup_model
+from model.scheduler import AdaptiveRateScheduler
+from model.encoder import FramePackager, DEFAULT_PROFILE
+from model.inference_pool import InferencePool
+from model.stream import FrameBroadcaster, push_frames
+from model.energy_logger import start_ingest, waste_ingestor
+from model.notifications import NOTIFICATIONS_KEY, NOTIFICATIONS_CHANNEL, WASTE_EVENTS_CHANNEL
+from model.notifications import build_notification, publish_async, NotificationSnapshot
 
 # --- 1. DATABASE CONFIGURATION ---
-DB_CONFIG = {
-    "dbname": "mydatabase",
-    "user": "postgres",
-    "password": "lou",
-    "host": "127.0.0.1",
-    "port": "5432"
-}
-
-def get_db_connection():
-    """Establishes a connection to the PostgreSQL database."""
-    return psycopg2.connect(**DB_CONFIG)
+# Connection settings (PG_* env vars), the shared pool and the query thread
+# pool live in database.py. Tools await fetch_all()/fetch_one(), which run
+# each query off the event loop with a statement timeout.
 
 def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
@@ -48,40 +51,40 @@ mcp = FastMCP("EnergyDatabase")
 
 # --- 3. MCP TOOLS ---
 @mcp.tool()
-def get_waste_summary_by_location(start_date: str, end_date: str) -> str:
+@tool_cache.cached()
+async def get_waste_summary_by_location(start_date: str, end_date: str) -> str:
     """
     Generates a financial report of energy waste grouped by location/room.
     Use this when the user asks "Which room is costing me the most?"
     
     Args:
         start_date: 'YYYY-MM-DD'
-        end_date: 'YYYY-MM-DD'
+        end_date: 'YYYY-MM-DD' (inclusive)
+    Days are local calendar days (the rollups' time zone, Asia/Manila).
     """
     query = """
         SELECT 
             l.name AS location_name,
-            COUNT(we.event_id) AS total_events,
-            SUM(we.duration_hours) AS total_hours_wasted,
-            SUM(we.kwh_consumed) AS total_kwh,
-            SUM(we.estimated_cost_php) AS total_cost_php
-        FROM waste_events we
-        JOIN device_catalog dc ON we.device_id = dc.device_id
+            SUM(r.event_count)::bigint AS total_events,
+            SUM(r.total_hours) AS total_hours_wasted,
+            SUM(r.total_kwh) AS total_kwh,
+            SUM(r.total_cost_php) AS total_cost_php
+        FROM waste_rollup_daily r
+        JOIN device_catalog dc ON r.device_id = dc.device_id
         JOIN locations l ON dc.location_id = l.location_id
-        WHERE we.detection_timestamp::date BETWEEN %s AND %s
+        WHERE r.bucket_date >= %s AND r.bucket_date < %s::date + 1
         GROUP BY l.name
         ORDER BY total_cost_php DESC
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (start_date, end_date))
-                results = cur.fetchall()
-                return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
+        results = await fetch_all(query, (start_date, end_date))
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_top_offending_devices(limit: int = 5) -> str:
+@tool_cache.cached()
+async def get_top_offending_devices(limit: int = 5) -> str:
     """
     Identifies specific devices that are the worst offenders for energy waste.
     Includes technical specs (wattage) to explain high costs.
@@ -94,55 +97,54 @@ def get_top_offending_devices(limit: int = 5) -> str:
             dc.device_name,
             l.name AS location,
             dc.avg_wattage_rating AS wattage,
-            COUNT(we.event_id) AS waste_frequency,
-            SUM(we.estimated_cost_php) AS total_cost_php
-        FROM waste_events we
-        JOIN device_catalog dc ON we.device_id = dc.device_id
+            SUM(r.event_count)::bigint AS waste_frequency,
+            SUM(r.total_cost_php) AS total_cost_php
+        FROM waste_rollup_daily r
+        JOIN device_catalog dc ON r.device_id = dc.device_id
         JOIN locations l ON dc.location_id = l.location_id
         GROUP BY dc.device_name, l.name, dc.avg_wattage_rating
         ORDER BY total_cost_php DESC
         LIMIT %s
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (limit,))
-                results = cur.fetchall()
-                return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
+        results = await fetch_all(query, (limit,))
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_waste_heatmap_by_hour() -> str:
+@tool_cache.cached()
+async def get_waste_heatmap_by_hour() -> str:
     """
     Analyzes time-of-day patterns to find when waste usually occurs.
     Essential for 'Prescriptive' analytics (e.g., "You leave lights on at 6 PM").
     """
     query = """
         SELECT 
-            EXTRACT(HOUR FROM we.detection_timestamp) AS hour_of_day,
-            COUNT(we.event_id) AS incident_count,
-            SUM(we.estimated_cost_php) AS total_cost_php
-        FROM waste_events we
+            EXTRACT(HOUR FROM r.bucket_start) AS hour_of_day,
+            SUM(r.event_count)::bigint AS incident_count,
+            SUM(r.total_cost_php) AS total_cost_php
+        FROM waste_rollup_hourly r
         GROUP BY hour_of_day
         ORDER BY total_cost_php DESC
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query)
-                results = cur.fetchall()
-                data = json.dumps([dict(r) for r in results], default=json_serial)
-                return f"Hourly Waste Analysis (0-23 hour format):\n{data}"
+        results = await fetch_all(query)
+        data = json.dumps([dict(r) for r in results], default=json_serial)
+        return f"Hourly Waste Analysis (0-23 hour format):\n{data}"
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_confidence_check(threshold: float = 0.8) -> str:
+@tool_cache.cached()
+async def get_confidence_check(threshold: float = 0.8, days: int = None) -> str:
     """
     Audits the system's performance. Returns events where the Computer Vision
     model was unsure (low confidence), but waste was logged anyway.
+    Pass `days` to look at the last N days only (default: all time).
     """
+    if days is not None and days <= 0:
+        return "Error: days must be a positive number of days, or omitted for all time."
     query = """
         SELECT 
             we.event_id,
@@ -152,22 +154,22 @@ def get_confidence_check(threshold: float = 0.8) -> str:
         FROM waste_events we
         JOIN device_catalog dc ON we.device_id = dc.device_id
         WHERE we.confidence_score < %s
+          AND (%s::int IS NULL OR we.detection_timestamp >= NOW() - make_interval(days => %s))
+          AND we.detection_timestamp < NOW()
         ORDER BY we.confidence_score ASC
         LIMIT 10
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (threshold,))
-                results = cur.fetchall()
-                if not results:
-                    return "No low-confidence detections found. System is healthy."
-                return json.dumps([dict(r) for r in results], default=json_serial)
+        results = await fetch_all(query, (threshold, days, days))
+        if not results:
+            return "No low-confidence detections found. System is healthy."
+        return json.dumps([dict(r) for r in results], default=json_serial)
     except Exception as e:
         return f"Error querying database: {str(e)}"
 
 @mcp.tool()
-def get_devices_by_location(location_name: str) -> str:
+@tool_cache.cached()
+async def get_devices_by_location(location_name: str) -> str:
     """
     Lists all devices in a specific room and their individual waste contribution.
     Use this when a user asks "Why is the [Room Name] so expensive?"
@@ -176,73 +178,69 @@ def get_devices_by_location(location_name: str) -> str:
         SELECT 
             dc.device_name,
             dc.avg_wattage_rating,
-            COUNT(we.event_id) as events,
-            SUM(we.estimated_cost_php) as total_cost
-        FROM waste_events we
-        JOIN device_catalog dc ON we.device_id = dc.device_id
+            SUM(r.event_count)::bigint as events,
+            SUM(r.total_cost_php) as total_cost
+        FROM waste_rollup_daily r
+        JOIN device_catalog dc ON r.device_id = dc.device_id
         JOIN locations l ON dc.location_id = l.location_id
         WHERE l.name ILIKE %s
         GROUP BY dc.device_name, dc.avg_wattage_rating
         ORDER BY total_cost DESC
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (f"%{location_name}%",))
-                results = cur.fetchall()
-                if not results:
-                    return f"No devices found for location: {location_name}"
-                return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
+        results = await fetch_all(query, (f"%{location_name}%",))
+        if not results:
+            return f"No devices found for location: {location_name}"
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error: {str(e)}"
     
 @mcp.tool()
-def get_weekly_trend_comparison() -> str:
+@tool_cache.cached()
+async def get_weekly_trend_comparison() -> str:
     """
     Compares this week's total waste cost vs. last week's.
     Returns a percentage change. Use for 'progress' or 'trend' questions.
     """
     query = """
         WITH this_week AS (
-            SELECT SUM(estimated_cost_php) as cost 
-            FROM waste_events 
-            WHERE detection_timestamp >= NOW() - INTERVAL '7 days'
+            SELECT SUM(total_cost_php) as cost 
+            FROM waste_rollup_hourly 
+            WHERE bucket_start >= date_trunc('hour', NOW() - INTERVAL '7 days')
         ),
         last_week AS (
-            SELECT SUM(estimated_cost_php) as cost 
-            FROM waste_events 
-            WHERE detection_timestamp >= NOW() - INTERVAL '14 days' 
-            AND detection_timestamp < NOW() - INTERVAL '7 days'
+            SELECT SUM(total_cost_php) as cost 
+            FROM waste_rollup_hourly 
+            WHERE bucket_start >= date_trunc('hour', NOW() - INTERVAL '14 days') 
+            AND bucket_start < date_trunc('hour', NOW() - INTERVAL '7 days')
         )
         SELECT 
             COALESCE((SELECT cost FROM this_week), 0) as current_week_cost,
             COALESCE((SELECT cost FROM last_week), 0) as previous_week_cost
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query)
-                res = cur.fetchone()
-                curr = float(res['current_week_cost'])
-                prev = float(res['previous_week_cost'])
-                
-                diff = curr - prev
-                if prev > 0:
-                    percent = (diff / prev) * 100
-                else:
-                    percent = 100 if curr > 0 else 0
-                
-                return json.dumps({
-                    "status": "worse" if diff > 0 else "better",
-                    "current_week_php": curr,
-                    "previous_week_php": prev,
-                    "change_percent": round(percent, 2)
-                })
+        res = await fetch_one(query)
+        curr = float(res['current_week_cost'])
+        prev = float(res['previous_week_cost'])
+        
+        diff = curr - prev
+        if prev > 0:
+            percent = (diff / prev) * 100
+        else:
+            percent = 100 if curr > 0 else 0
+        
+        return json.dumps({
+            "status": "worse" if diff > 0 else "better",
+            "current_week_php": curr,
+            "previous_week_php": prev,
+            "change_percent": round(percent, 2)
+        })
     except Exception as e:
         return f"Error: {str(e)}"
     
 @mcp.tool()
-def get_recent_logs(limit: int = 5) -> str:
+@tool_cache.cached(ttl=30)  # "what just happened" should not lag by the full TTL
+async def get_recent_logs(limit: int = 5) -> str:
     """
     Fetches the raw log of the most recent waste detection events.
     Use this if the user asks "What just happened?" or "Show me the latest alerts."
@@ -260,10 +258,8 @@ def get_recent_logs(limit: int = 5) -> str:
         LIMIT %s
     """
     try:
-        with get_db_connection() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(query, (limit,))
-                return json.dumps([dict(r) for r in cur.fetchall()], default=json_serial, indent=2)
+        results = await fetch_all(query, (limit,))
+        return json.dumps([dict(r) for r in results], default=json_serial, indent=2)
     except Exception as e:
         return f"Error: {str(e)}"
 
@@ -289,155 +285,360 @@ sio = socketio.AsyncServer(
 socket_app = socketio.ASGIApp(sio, app)
 
 # --- 6. REDIS CONNECTION ---
-try:
-    redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        password=os.getenv('REDIS_PASSWORD', 'securepassword'),
-        decode_responses=True
-    )
-    redis_client.ping()
-    print("[REDIS] Connected successfully")
-except Exception as e:
-    print(f"[REDIS] Connection failed: {e}")
-    redis_client = None
+# One async connection pool shared by the REST endpoints, the Socket.IO
+# handlers and the pub/sub listener. redis_client stays None until startup
+# has confirmed the server is reachable.
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 20))
+
+redis_pool = aioredis.BlockingConnectionPool(
+    host=os.getenv('REDIS_HOST', 'localhost'),
+    port=int(os.getenv('REDIS_PORT', 6379)),
+    password=os.getenv('REDIS_PASSWORD', 'securepassword'),
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=5
+)
+redis_client = None
+notification_listener = None  # asyncio task running listen_for_notifications()
+
+async def connect_redis():
+    """Ping Redis through the pool and expose the client if it answers"""
+    global redis_client
+    client = aioredis.Redis(connection_pool=redis_pool)
+    try:
+        await client.ping()
+        redis_client = client
+        print("[REDIS] Connected successfully")
+    except Exception as e:
+        print(f"[REDIS] Connection failed: {e}")
 
 # --- 7. REDIS PUB/SUB LISTENER ---
+# Recent notifications for the connect-time sync, dropped whenever a new
+# one is announced
+notification_snapshot = NotificationSnapshot()
+
 async def listen_for_notifications():
-    """Listen to Redis pub/sub for new notifications and broadcast to all connected clients"""
+    """
+    Broadcast each notification published on Redis to all clients as it
+    arrives, and drop cached MCP tool results when new waste events land.
+    """
     if not redis_client:
         return
     
-    pubsub = redis_client.pubsub()
-    pubsub.subscribe('voltguard:notifications:new')
-    
-    print("[REDIS] Listening for notifications...")
-    
     while True:
         try:
-            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
-            if message and message['type'] == 'message':
-                notification = json.loads(message['data'])
-                await sio.emit('notification', notification)
-                print(f"[BROADCAST] Notification sent to all clients: {notification['message']}")
-            await asyncio.sleep(0.1)
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(NOTIFICATIONS_CHANNEL, WASTE_EVENTS_CHANNEL)
+                # Anything published while we were not subscribed is unseen
+                notification_snapshot.invalidate()
+                tool_cache.invalidate()
+                print("[REDIS] Listening for notifications...")
+                
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    if message['channel'] == WASTE_EVENTS_CHANNEL:
+                        # New waste events: cached MCP analytics are stale
+                        tool_cache.invalidate()
+                        continue
+                    notification_snapshot.invalidate()
+                    notification = json.loads(message['data'])
+                    await sio.emit('notification', notification)
+                    print(f"[BROADCAST] Notification sent to all clients: {notification['message']}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"[ERROR] Redis listener error: {e}")
             await asyncio.sleep(1)
 
-# --- 8. SOCKET.IO EVENTS ---
+# --- 8. VIDEO PRODUCER ---
+# A background loop grabs camera frames, lets the adaptive scheduler pick
+# which ones to process and hands those to the inference pool; the pool
+# publishes annotated frames, JPEG-encoded once per profile, that every
+# viewer reads. Nothing here runs on the event loop. The scheduler picks the
+# detection rate from the room's state (SCHEDULER_ACTIVE_FPS/IDLE_FPS);
+# VIDEO_TARGET_FPS only caps it and the viewers' delivery rate.
+VIDEO_TARGET_FPS = float(os.getenv('VIDEO_TARGET_FPS', 15))
+# YOLO calls are serialized on the shared model; extra workers only overlap
+# annotation and encoding with inference
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 1))
+INFERENCE_QUEUE_SIZE = int(os.getenv('INFERENCE_QUEUE_SIZE', 2))
+FRAME_WAIT_TIMEOUT = 2.0  # seconds a viewer waits for a fresh frame
+MJPEG_MAX_STREAMS = int(os.getenv('MJPEG_MAX_STREAMS', 8))
+CAMERA_ID = default_room.location_id or 'default'
+
+frame_packager = FramePackager()
+
+def process_and_package_frame(frame):
+    """Detect one captured frame and encode it in the profiles viewers use"""
+    frame, detections = analyze_frame(frame)
+    return frame_packager.package(
+        frame,
+        camera=CAMERA_ID,
+        detections=describe_detections(detections),
+        human_present=default_room.human_present
+    )
+
+def frame_metadata(packet, seq, profile):
+    """Small header sent alongside binary frames"""
+    return {
+        'seq': seq,
+        'timestamp': packet.timestamp,
+        'profile': profile,
+        **packet.meta
+    }
+
+async def frame_jpeg(packet, profile):
+    """JPEG bytes for a profile; encodes off the event loop on a cache miss"""
+    if packet.is_encoded(profile):
+        return packet.jpeg(profile)
+    return await asyncio.to_thread(packet.jpeg, profile)
+
+inference_pool = InferencePool(
+    process_and_package_frame,
+    workers=INFERENCE_WORKERS,
+    max_queue=INFERENCE_QUEUE_SIZE
+)
+frame_scheduler = AdaptiveRateScheduler(
+    default_room,
+    max_fps=VIDEO_TARGET_FPS
+)
+frame_broadcaster = FrameBroadcaster(
+    retrieve_frame,
+    fps=VIDEO_TARGET_FPS,
+    dispatch=inference_pool.submit,
+    grab=grab_frame,
+    scheduler=frame_scheduler
+)
+inference_pool.on_result = frame_broadcaster.publish
+viewer_seq = {}  # sid -> last frame seq sent to that client
+push_tasks = {}  # sid -> asyncio task streaming frames to that client
+mjpeg_streams = 0  # open /api/video_feed responses
+
+# --- 9. SOCKET.IO EVENTS ---
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
     print(f"Client connected: {sid}")
     
-    # Send existing notifications to newly connected client
+    # Send the notifications this client missed as a single message; a
+    # reconnecting client passes the cursor of the last one it has seen
     if redis_client:
         try:
-            notifications = redis_client.lrange('voltguard:notifications', 0, 49)
-            for notif_str in reversed(notifications):
-                notification = json.loads(notif_str)
-                await sio.emit('notification', notification, room=sid)
+            since = auth.get('since') if isinstance(auth, dict) else None
+            batch = await notification_snapshot.batch(redis_client, since)
+            await sio.emit('notifications_batch', batch, room=sid)
         except Exception as e:
             print(f"[ERROR] Failed to send existing notifications: {e}")
 
 @sio.event
 async def disconnect(sid):
+    viewer_seq.pop(sid, None)
+    task = push_tasks.pop(sid, None)
+    if task:
+        task.cancel()
     print(f"Client disconnected: {sid}")
 
 @sio.event
 async def get_frame(sid, data):
-    frame = get_video_frame()
+    # Serve the next frame published by the background producer; viewers never
+    # touch the camera or the model themselves.
+    profile = frame_packager.request((data or {}).get('profile', DEFAULT_PROFILE))
+    seq, packet = await frame_broadcaster.next_frame(
+        viewer_seq.get(sid, 0), timeout=FRAME_WAIT_TIMEOUT
+    )
+    frame_bytes = await frame_jpeg(packet, profile) if packet is not None else None
     
-    if frame is not None:
-        # Encode frame to JPEG
-        success, buffer = cv2.imencode('.jpg', frame)
-        if success:
-            frame_b64 = base64.b64encode(buffer.tobytes()).decode('utf-8')
-            await sio.emit('frame', {
-                'image': frame_b64
-            }, room=sid)
-        else:
-            await sio.emit('error', {'message': 'Failed to encode frame'}, room=sid)
+    if frame_bytes is not None:
+        viewer_seq[sid] = seq
+        frame_b64 = base64.b64encode(frame_bytes).decode('utf-8')
+        await sio.emit('frame', {
+            'image': frame_b64
+        }, room=sid)
+    else:
+        await sio.emit('error', {'message': 'Failed to grab frame'}, room=sid)
+
+@sio.event
+async def get_frame_binary(sid, data):
+    """Pull one frame as raw JPEG bytes (binary attachment) plus a metadata header"""
+    profile = frame_packager.request((data or {}).get('profile', DEFAULT_PROFILE))
+    seq, packet = await frame_broadcaster.next_frame(
+        viewer_seq.get(sid, 0), timeout=FRAME_WAIT_TIMEOUT
+    )
+    
+    if packet is not None:
+        viewer_seq[sid] = seq
+        await sio.emit('frame_binary', {
+            'meta': frame_metadata(packet, seq, profile),
+            'image': await frame_jpeg(packet, profile)
+        }, room=sid)
     else:
         await sio.emit('error', {'message': 'Failed to grab frame'}, room=sid)
 
-# --- 9. FASTAPI ENDPOINTS ---
+async def push_frames_to(sid, fps, profile, binary):
+    """Stream frames to one client at the negotiated rate until cancelled"""
+    async def send(seq, packet):
+        frame_bytes = await frame_jpeg(packet, profile)
+        if binary:
+            await sio.emit('frame_binary', {
+                'meta': frame_metadata(packet, seq, profile),
+                'image': frame_bytes
+            }, room=sid)
+        else:
+            await sio.emit('frame', {
+                'image': base64.b64encode(frame_bytes).decode('utf-8')
+            }, room=sid)
+    
+    await push_frames(frame_broadcaster, send, fps, timeout=FRAME_WAIT_TIMEOUT,
+                      before_wait=lambda: frame_packager.request(profile))
+
+@sio.event
+async def subscribe_frames(sid, data):
+    """
+    Server-push mode: the server streams frames at the negotiated rate instead
+    of the client requesting each one. Returns the negotiated settings as ack.
+    """
+    data = data or {}
+    fps = min(float(data.get('fps', VIDEO_TARGET_FPS)), VIDEO_TARGET_FPS)
+    fps = max(fps, 0.1)
+    profile = frame_packager.request(data.get('profile', DEFAULT_PROFILE))
+    binary = bool(data.get('binary', True))
+    
+    task = push_tasks.pop(sid, None)
+    if task:
+        task.cancel()
+    push_tasks[sid] = asyncio.create_task(push_frames_to(sid, fps, profile, binary))
+    return {'fps': fps, 'profile': profile, 'binary': binary, 'camera': CAMERA_ID}
+
+@sio.event
+async def unsubscribe_frames(sid, data=None):
+    task = push_tasks.pop(sid, None)
+    if task:
+        task.cancel()
+    return {'status': 'unsubscribed'}
+
+# --- 10. FASTAPI ENDPOINTS ---
 
 @app.get("/api/video_feed")
-def video_feed():
-    """HTTP video stream endpoint (multipart/x-mixed-replace)"""
-    from fastapi.responses import StreamingResponse
+async def video_feed(request: Request, fps: float = VIDEO_TARGET_FPS, profile: str = DEFAULT_PROFILE):
+    """HTTP video stream endpoint (multipart/x-mixed-replace), paced to ?fps="""
+    global mjpeg_streams
+    if mjpeg_streams >= MJPEG_MAX_STREAMS:
+        raise HTTPException(status_code=503, detail="Too many open video streams")
     
-    def generate_frames():
-        while True:
-            frame = get_video_frame()
-            if frame is not None:
-                success, buffer = cv2.imencode('.jpg', frame)
-                if success:
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+    fps = max(min(fps, VIDEO_TARGET_FPS), 0.1)
+    profile = frame_packager.request(profile)
+    
+    # Reserve the slot before responding so concurrent requests can't all
+    # pass the check; released once, by whichever of the generator's
+    # finally or the response's background task runs first
+    mjpeg_streams += 1
+    released = False
+
+    def release_slot():
+        global mjpeg_streams
+        nonlocal released
+        if not released:
+            released = True
+            mjpeg_streams -= 1
+    
+    async def generate_frames():
+        # Reads the shared latest frame from the producer; nothing here
+        # touches the camera or the model, and it ends with the connection.
+        interval = 1.0 / fps
+        loop = asyncio.get_running_loop()
+        seq = 0
+        try:
+            while not await request.is_disconnected():
+                started = loop.time()
+                frame_packager.request(profile)
+                new_seq, packet = await frame_broadcaster.next_frame(seq, timeout=FRAME_WAIT_TIMEOUT)
+                if packet is not None and new_seq != seq:
+                    seq = new_seq
+                    frame_bytes = await frame_jpeg(packet, profile)
+                    if frame_bytes is not None:
+                        yield (b'--frame\r\n'
+                               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                await asyncio.sleep(max(interval - (loop.time() - started), 0))
+        finally:
+            release_slot()
     
     return StreamingResponse(
         generate_frames(),
-        media_type="multipart/x-mixed-replace; boundary=frame"
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        # Covers responses whose body was never iterated
+        background=BackgroundTask(release_slot)
     )
 
+@app.get("/api/video/stats")
+def video_stats():
+    """Detection rate, inference pool backpressure and motion-gate counters"""
+    return {
+        "scheduler": frame_scheduler.stats(),
+        "inference": inference_pool.stats(),
+        "motion_gate": default_room.gate.stats(),
+        "mjpeg_streams": {"open": mjpeg_streams, "max": MJPEG_MAX_STREAMS},
+        "encoder": {
+            "backend": frame_packager.encoder.name,
+            "active_profiles": sorted(frame_packager.active_profiles())
+        }
+    }
+
+@app.get("/api/db/health")
+async def db_health():
+    """Check that the MCP tools' connection pool can reach PostgreSQL"""
+    try:
+        await fetch_one("SELECT 1")
+        return {"status": "ok", "pool": get_pool().stats(), "ingest": waste_ingestor.stats()}
+    except Exception as e:
+        return {"status": "error", "error": str(e), "ingest": waste_ingestor.stats()}
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    """Hit/miss counters for the MCP tool result cache"""
+    return tool_cache.stats()
+
 @app.get("/api/notifications")
-def get_notifications(limit: int = 50):
+async def get_notifications(limit: int = 50):
     """Get recent notifications from Redis"""
     if not redis_client:
         return {"error": "Redis not available"}
     
     try:
-        notifications = redis_client.lrange('voltguard:notifications', 0, limit - 1)
+        notifications = await redis_client.lrange(NOTIFICATIONS_KEY, 0, limit - 1)
         return [json.loads(n) for n in notifications]
     except Exception as e:
         return {"error": str(e)}
 
 @app.post("/api/notifications/send")
-def send_notification(message: str, device: str = None, level: str = "info"):
+async def send_notification(message: str, device: str = None, level: str = "info"):
     """Send a new notification via Redis pub/sub"""
     if not redis_client:
         return {"error": "Redis not available"}
     
     try:
-        import time
-        from datetime import timezone
-        
-        notification = {
-            "id": f"notif_{int(time.time() * 1000)}_{device or 'manual'}",
-            "message": message,
-            "device": device,
-            "level": level,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "read": False
-        }
-        
-        # Store in Redis list
-        redis_client.lpush('voltguard:notifications', json.dumps(notification))
-        redis_client.ltrim('voltguard:notifications', 0, 99)  # Keep only last 100
-        
-        # Publish to pub/sub channel
-        redis_client.publish('voltguard:notifications:new', json.dumps(notification))
+        notification = build_notification(message, device=device, level=level)
+        # List push, trim to retention and pub/sub announce in one round trip
+        await publish_async(redis_client, [notification])
+        notification_snapshot.invalidate()
         
         return {"status": "sent", "notification": notification}
     except Exception as e:
         return {"error": str(e)}
 
 @app.delete("/api/notifications")
-def clear_notifications():
+async def clear_notifications():
     """Clear all notifications from Redis"""
     if not redis_client:
         return {"error": "Redis not available"}
     
     try:
-        redis_client.delete('voltguard:notifications')
+        await redis_client.delete(NOTIFICATIONS_KEY)
+        notification_snapshot.invalidate()
         return {"status": "notifications cleared"}
     except Exception as e:
         return {"error": str(e)}
 
-# --- 10. MCP ENDPOINT ---
+# --- 11. MCP ENDPOINT ---
 # Mount MCP before wrapping with Socket.IO
 try:
     sse_handler = mcp.sse_app()
@@ -448,14 +649,23 @@ except AttributeError as e:
 except Exception as e:
     print(f"⚠️ Failed to mount MCP: {e}", file=sys.stderr)
 
-# --- 11. STARTUP & SHUTDOWN EVENTS ---
+# --- 12. STARTUP & SHUTDOWN EVENTS ---
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    global notification_listener
+    # Load and warm the detector off the event loop so the API and MCP tools
+    # serve immediately; the first frames wait on the worker, not the loop.
+    threading.Thread(target=warmup_model, name="model-warmup", daemon=True).start()
+    inference_pool.start()
+    frame_broadcaster.start()
+    start_ingest()
+    
+    await connect_redis()
     if redis_client:
         # Add dummy notifications for testing (only if Redis is empty)
         try:
-            existing_count = redis_client.llen('voltguard:notifications')
+            existing_count = await redis_client.llen(NOTIFICATIONS_KEY)
             
             if existing_count == 0:
                 import time
@@ -496,8 +706,8 @@ async def startup_event():
                     }
                 ]
                 
-                for notif in dummy_notifications:
-                    redis_client.lpush('voltguard:notifications', json.dumps(notif))
+                # Seed the list only; the dummies are not announced on pub/sub
+                await publish_async(redis_client, dummy_notifications, broadcast=False)
                 
                 print(f"[REDIS] Added {len(dummy_notifications)} dummy notifications")
             else:
@@ -505,19 +715,25 @@ async def startup_event():
         except Exception as e:
             print(f"[ERROR] Failed to add dummy notifications: {e}")
         
-        asyncio.create_task(listen_for_notifications())
+        notification_listener = asyncio.create_task(listen_for_notifications())
 
 @app.on_event("shutdown")
-def shutdown_event():
+async def shutdown_event():
     """Cleanup on shutdown"""
     print("Shutting down VoltGuard Unified Server...")
-    from model.check import camera
-    if camera:
-        camera.release()
-    import cv2
+    if notification_listener:
+        notification_listener.cancel()
+    await redis_pool.disconnect()
+    close_pool()
+    frame_broadcaster.stop()
+    inference_pool.stop()
+    waste_ingestor.stop()
+    from model import detection
+    if detection.camera:
+        detection.camera.release()
     cv2.destroyAllWindows()
 
-# --- 12. MAIN EXECUTION ---
+# --- 13. MAIN EXECUTION ---
 if __name__ == "__main__":
     def signal_handler(sig, frame):
         print("\nReceived termination signal. Shutting down gracefully...")
@@ -0,0 +1,60 @@
+"""
+Inference backend selection.
+
+The same detection pipeline can run on the PyTorch weights or on an
+exported ONNX Runtime / OpenVINO model. Exported models are loaded through
+ultralytics, which reads the class names embedded at export time, so
+`model.names` and the Results/box format are the same on every backend.
+Create the exported files with `python -m model.export`.
+"""
+import os
+import threading
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(MODEL_DIR, "best_max.pt")
+
+BACKENDS = ("torch", "onnx", "openvino")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+INFERENCE_INT8 = os.getenv("INFERENCE_INT8", "0") == "1"
+
+
+def weights_path(backend=INFERENCE_BACKEND, int8=INFERENCE_INT8, base=MODEL_PATH):
+    """File (or directory, for OpenVINO) holding the weights for a backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    stem = os.path.splitext(base)[0]
+    if backend == "torch":
+        return base
+    if backend == "onnx":
+        return f"{stem}.int8.onnx" if int8 else f"{stem}.onnx"
+    return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+
+
+_model = None
+_model_load_lock = threading.Lock()
+
+
+def load_model(backend=INFERENCE_BACKEND, int8=INFERENCE_INT8, base=MODEL_PATH):
+    """Load the detector for the configured backend, falling back to PyTorch"""
+    # Imported here so torch is only pulled in when a model is actually needed
+    from ultralytics import YOLO
+
+    path = weights_path(backend, int8, base)
+    if backend != "torch" and not os.path.exists(path):
+        print(f"[MODEL] {path} not found; run `python -m model.export --format {backend}"
+              f"{' --int8' if int8 else ''}`. Falling back to PyTorch.")
+        backend, path = "torch", base
+
+    print(f"[MODEL] Loading {backend} backend from {path}")
+    return YOLO(path, task="detect")
+
+
+def get_model():
+    """The process-wide detector, loaded on first use"""
+    global _model
+    if _model is None:
+        with _model_load_lock:
+            if _model is None:
+                _model = load_model()
+    return _model
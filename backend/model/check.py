@@ -1,9 +1,17 @@
+import sys
+from pathlib import Path
+
 import cv2
-from ultralytics import YOLO
 import numpy as np
 
+# Package-absolute imports so `python model/check.py` still runs on its own
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from model.lighting import analyze_lights
+from model.encoder import encode_frame
+
 # --- Initialize model and camera ---
-model = YOLO("yolov8n.pt")  # or your custom-trained model
+# Both are created on first use so importing this module stays cheap
+model = None
 camera = None
 
 # COCO class index for laptop is 64
@@ -17,18 +25,13 @@ def get_camera():
         camera = cv2.VideoCapture(0)
     return camera
 
-def analyze_light(crop):
-    """
-    Detect if a bright object (like a laptop screen or bulb) is ON.
-    Checks the maximum intensity in the central region of the crop.
-    """
-    if crop.size == 0:
-        return False
-    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
-    center_crop = gray[h//4:3*h//4, w//4:3*w//4]
-    max_intensity = np.max(center_crop)
-    return max_intensity > 250  # adjust threshold for your lighting
+def get_model():
+    """Lazy model initialization"""
+    global model
+    if model is None:
+        from ultralytics import YOLO
+        model = YOLO("yolov8n.pt")  # or your custom-trained model
+    return model
 
 def get_frame():
     """Get a single processed frame with detection"""
@@ -43,19 +46,21 @@ def get_frame():
     stats["lights_on"] = 0
     stats["lights_off"] = 0
 
+    model = get_model()
     results = model(frame, stream=True)
     for r in results:
         if hasattr(r, 'boxes') and r.boxes is not None:
             boxes = r.boxes
             cls = boxes.cls
-            xyxy = boxes.xyxy
+            xyxy = boxes.xyxy.cpu().numpy().astype(int)
+            # ON/OFF for all boxes in one pass (adjust threshold for your lighting)
+            lights_on = analyze_lights(frame, xyxy)
 
             for i, c in enumerate(cls):
-                x1, y1, x2, y2 = map(int, xyxy[i])
-                crop = frame[y1:y2, x1:x2]
+                x1, y1, x2, y2 = xyxy[i]
 
                 if model.names[int(c)] == 'laptop':
-                    is_on = analyze_light(crop)
+                    is_on = bool(lights_on[i])
                     status_text = "ON" if is_on else "OFF"
                     color = (0, 255, 0) if is_on else (0, 0, 255)
                     cv2.putText(frame, f"Laptop: {status_text}", (x1, y1 - 10),
@@ -75,18 +80,9 @@ def get_frame():
     cv2.putText(frame, f"Lights OFF: {stats['lights_off']}", (10, 60),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
 
-    # Compress frame
-    scale_percent = 60
-    width = int(frame.shape[1] * scale_percent / 100)
-    height = int(frame.shape[0] * scale_percent / 100)
-    frame = cv2.resize(frame, (width, height))
-    
-    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 50]
-    ret, buffer = cv2.imencode('.jpg', frame, encode_param)
-    
-    if ret:
-        return buffer.tobytes(), stats
-    return None, stats
+    # Compress frame (60% size, quality 50)
+    frame_bytes = encode_frame(frame, "dashboard")
+    return frame_bytes, stats
 
 def main_loop():
     """For standalone testing"""
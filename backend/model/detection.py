@@ -1,109 +1,225 @@
 import cv2
-from ultralytics import YOLO
 import numpy as np
-import time
 import os
+import time
+import threading
+from collections import namedtuple
 from datetime import datetime, timezone
 from . import energy_logger as logger  # direct import ✅
-
-# --- Initialize model and globals ---
-# Get the absolute path to the model file
-MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_PATH = os.path.join(MODEL_DIR, "best_max.pt")
-
-model = YOLO(MODEL_PATH)
+from .lighting import analyze_lights
+from .motion_gate import MotionGate
+from .scheduler import AdaptiveRateScheduler
+from .backends import get_model
+from .replay import open_source
+
+# --- Initialize globals ---
+# The model (best_max.pt, or its ONNX/OpenVINO export when INFERENCE_BACKEND
+# is set) is loaded lazily by get_model(); call warmup() to load it early.
 camera = None
 
 POWER_RATINGS = {"laptop": 0.05, "lamp": 0.01, "screen": 0.1}
 HUMAN_ABSENT_THRESHOLD = 20  # seconds
 
-device_log = {}
-human_last_seen = 0
-human_present = False
-active_waste_events = {}
+# Inference pool workers share one model; each room has its own state lock
+_model_lock = threading.Lock()
+
+# Boxes for one frame as plain numpy arrays (xyxy: int Nx4, cls: int N, conf: float N)
+Detections = namedtuple("Detections", ["xyxy", "cls", "conf"])
+
+
+class RoomState:
+    """Presence and waste tracking for one camera/location"""
+
+    def __init__(self, location_id=None):
+        self.location_id = location_id
+        self.device_log = {}
+        self.human_last_seen = 0
+        self.human_present = False
+        self.active_waste_events = {}
+        self.lock = threading.Lock()
+
+        # Static scenes reuse the last detections instead of re-running YOLO
+        self.gate = MotionGate()
+        self.last_detections = None
+
+
+# State for the single-camera path (get_frame / main_loop); LOCATION_ID ties
+# it to a row in the locations table
+default_room = RoomState(os.getenv("LOCATION_ID"))
 
 
 # -------------------------------
 # CAMERA + FRAME FUNCTIONS
 # -------------------------------
 def get_camera():
-    """Lazy camera initialization"""
+    """Lazy camera initialization (CAMERA_SOURCE: device index, video file or image directory)"""
     global camera
     if camera is None or not camera.isOpened():
-        camera = cv2.VideoCapture(0)
+        camera = open_source()
     return camera
 
 
-def analyze_light(crop):
-    """Detect if a bright object (like a laptop or bulb) is ON."""
-    if crop.size == 0:
-        return False
-    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
-    center_crop = gray[h // 4: 3 * h // 4, w // 4: 3 * w // 4]
-    return np.max(center_crop) > 250
-
-
-def update_device_status(name, is_on):
+def update_device_status(room, name, is_on, confidence=None):
     """Update or initialize device ON/OFF status"""
-    if name not in device_log:
-        device_log[name] = {"is_on": False, "last_change": time.time()}
-    device_log[name]["is_on"] = is_on
-    device_log[name]["last_change"] = time.time()
-
+    if name not in room.device_log:
+        room.device_log[name] = {"is_on": False, "last_change": time.time()}
+    room.device_log[name]["is_on"] = is_on
+    room.device_log[name]["last_change"] = time.time()
+    if confidence is not None:
+        room.device_log[name]["confidence"] = round(float(confidence), 4)
 
-def get_frame():
-    """Read a single frame and perform detection"""
-    global human_present, human_last_seen, active_waste_events
 
+def read_frame():
+    """Grab a single raw frame from the camera (None if unavailable)"""
     cap = get_camera()
     success, frame = cap.read()
     if not success:
         return None
+    return frame
+
+
+def grab_frame():
+    """Latch the next camera frame without decoding it"""
+    return get_camera().grab()
+
+
+def retrieve_frame():
+    """Decode the frame latched by grab_frame() (None if unavailable)"""
+    success, frame = get_camera().retrieve()
+    return frame if success else None
+
+
+def get_frame():
+    """Read a single frame and perform detection"""
+    frame = read_frame()
+    if frame is None:
+        return None
+    return process_frame(frame)
+
+
+def process_frame(frame, room=None):
+    """Run detection on a captured frame and update presence/waste state"""
+    return analyze_frame(frame, room)[0]
+
 
-    results = model(frame, stream=True)
+def analyze_frame(frame, room=None):
+    """Like process_frame, but returns (annotated_frame, detections)"""
+    room = room or default_room
+    # Inference pool workers share the room: the gate and last_detections
+    # change under its lock, YOLO itself runs outside it
+    with room.lock:
+        infer = needs_inference(frame, room)
+        detections = room.last_detections
+    if infer:
+        detections = detect_batch([frame])[0]
+        with room.lock:
+            room.last_detections = detections
+    return apply_detections(frame, detections, room), detections
+
+
+def needs_inference(frame, room):
+    """Motion gate: False when the scene is unchanged and detections can be reused"""
+    return room.gate.should_infer(frame) or room.last_detections is None
+
+
+# -------------------------------
+# INFERENCE
+# -------------------------------
+def to_detections(result):
+    """Convert an ultralytics Results object into plain numpy Detections"""
+    boxes = getattr(result, "boxes", None)
+    if boxes is None or len(boxes) == 0:
+        return Detections(np.empty((0, 4), dtype=int), np.empty(0, dtype=int), np.empty(0))
+    return Detections(
+        boxes.xyxy.cpu().numpy().astype(int),
+        boxes.cls.cpu().numpy().astype(int),
+        boxes.conf.cpu().numpy(),
+    )
+
+
+def detect_batch(frames):
+    """Run one YOLO call over a list of frames; returns Detections per frame"""
+    # The model isn't safe for concurrent predict calls, so inference is
+    # serialized here; other workers can annotate meanwhile.
+    model = get_model()
+    with _model_lock:
+        results = model(frames, stream=False)
+    return [to_detections(r) for r in results]
+
+
+def describe_detections(detections):
+    """JSON-friendly list of {label, confidence, box} for one frame"""
+    names = get_model().names
+    return [
+        {"label": names[int(c)], "confidence": round(float(conf), 3), "box": [int(v) for v in box]}
+        for box, c, conf in zip(detections.xyxy, detections.cls, detections.conf)
+    ]
+
+
+def warmup():
+    """Load the shared model and run one dummy inference so the first real frame is fast"""
+    started = time.time()
+    detect_batch([np.zeros((480, 640, 3), dtype=np.uint8)])
+    print(f"[MODEL] Warm-up finished in {time.time() - started:.1f}s")
+
+
+# -------------------------------
+# PRESENCE + WASTE STATE
+# -------------------------------
+def apply_detections(frame, detections, room):
+    """Annotate the frame and update the room's presence/waste state"""
+    with room.lock:
+        frame, waste_started = _update_state(frame, detections, room)
+    # Redis round trip after releasing the lock, and only when a waste
+    # event actually queued a notification
+    if waste_started:
+        logger.flush_notifications()
+    return frame
+
+
+def _update_state(frame, detections, room):
+    names = get_model().names
     detected_classes = set()
 
+    # ON/OFF for every box in one pass, before any annotation is drawn
+    lights_on = analyze_lights(frame, detections.xyxy)
+
     # --- Detection Loop ---
-    for r in results:
-        if hasattr(r, "boxes") and r.boxes is not None:
-            for i, c in enumerate(r.boxes.cls):
-                name = model.names[int(c)]
-                detected_classes.add(name)
-
-                x1, y1, x2, y2 = map(int, r.boxes.xyxy[i])
-                crop = frame[y1:y2, x1:x2]
-
-                if name in POWER_RATINGS:
-                    is_on = analyze_light(crop)
-                    update_device_status(name, is_on)
-                    color = (0, 255, 0) if is_on else (0, 0, 255)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame, f"{name}: {'ON' if is_on else 'OFF'}",
-                                (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-                else:
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 2)
-                    cv2.putText(frame, name, (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+    for (x1, y1, x2, y2), c, conf, is_on in zip(detections.xyxy, detections.cls,
+                                                detections.conf, lights_on):
+        name = names[int(c)]
+        detected_classes.add(name)
+
+        if name in POWER_RATINGS:
+            is_on = bool(is_on)
+            update_device_status(room, name, is_on, conf)
+            color = (0, 255, 0) if is_on else (0, 0, 255)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(frame, f"{name}: {'ON' if is_on else 'OFF'}",
+                        (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        else:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 2)
+            cv2.putText(frame, name, (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
 
     # --- Human Presence Detection ---
     if "person" in detected_classes:
-        human_present = True
-        human_last_seen = time.time()
+        room.human_present = True
+        room.human_last_seen = time.time()
         cv2.putText(frame, f"Human: Present",
                     (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
     else:
         # If human_last_seen is None (never seen), treat as absent immediately
-        if human_last_seen == 0:
-            human_present = False
+        if room.human_last_seen == 0:
+            room.human_present = False
             elapsed_absence = float('inf')
         else:
-            elapsed_absence = time.time() - human_last_seen
-            human_present = elapsed_absence <= HUMAN_ABSENT_THRESHOLD
+            elapsed_absence = time.time() - room.human_last_seen
+            room.human_present = elapsed_absence <= HUMAN_ABSENT_THRESHOLD
 
         remaining = int(max(HUMAN_ABSENT_THRESHOLD - elapsed_absence, 0))
 
-        if human_present:
+        if room.human_present:
             cv2.putText(frame, f"Inactivity Countdown: {remaining}s",
                         (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
         else:
@@ -113,27 +229,30 @@ def get_frame():
 
 
     # --- Energy Waste Detection ---
-    for device, record in device_log.items():
-        if record["is_on"] and not human_present:
-            if device not in active_waste_events:
+    waste_started = False
+    for device, record in room.device_log.items():
+        if record["is_on"] and not room.human_present:
+            if device not in room.active_waste_events:
                 start_time = time.time()
-                active_waste_events[device] = start_time
-                logger.log_waste_start(device, start_time)
+                room.active_waste_events[device] = start_time
+                logger.log_waste_start(device, start_time, location_id=room.location_id)
+                waste_started = True
                 print(f"⚠️ Waste detected for {device} (human absent 20s).")
 
     # ✅ When human returns, finalize all at once
-    if human_present and active_waste_events:
+    if room.human_present and room.active_waste_events:
         print("✅ Human returned — finalizing all waste logs...")
-        for device, start_time in list(active_waste_events.items()):
+        for device, start_time in list(room.active_waste_events.items()):
             end_time = time.time()
-            logger.log_waste_end(device, start_time, end_time)
-            del active_waste_events[device]
+            logger.log_waste_end(device, start_time, end_time, location_id=room.location_id,
+                                 confidence=room.device_log.get(device, {}).get("confidence"))
+            del room.active_waste_events[device]
 
         logger.save_all_once()
 
 
 
-    return frame
+    return frame, waste_started
 
 
 # -------------------------------
@@ -142,19 +261,29 @@ def get_frame():
 def main_loop():
     """Run VoltGuard detection continuously"""
     print("Starting VoltGuard Detection...")
+    logger.start_ingest()
+    scheduler = AdaptiveRateScheduler(default_room)
     while True:
-        frame = get_frame()
-        if frame is None:
+        # Grab every camera frame so the buffer stays fresh, but only decode
+        # and detect the ones the scheduler asks for
+        if not grab_frame():
             print("Camera not available.")
             break
-
-        cv2.imshow("VoltGuard Live", frame)
+        if scheduler.due():
+            frame = retrieve_frame()
+            if frame is None:
+                print("Camera not available.")
+                break
+            cv2.imshow("VoltGuard Live", process_frame(frame))
+
+        # Every iteration, so the window repaints and 'q' works at the idle rate
         if cv2.waitKey(1) & 0xFF == ord("q"):
             break
 
     if camera:
         camera.release()
     cv2.destroyAllWindows()
+    logger.waste_ingestor.stop()
     print("VoltGuard stopped.")
 
 
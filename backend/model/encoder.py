@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+import cv2
+
+# Named output profiles: scale factor applied to the annotated frame and JPEG quality
+ENCODE_PROFILES = {
+    "thumbnail": {"scale": 0.3, "quality": 40},
+    "dashboard": {"scale": 0.6, "quality": 50},
+    "full": {"scale": 1.0, "quality": 95},
+}
+DEFAULT_PROFILE = os.getenv("VIDEO_DEFAULT_PROFILE", "full")
+JPEG_ENCODER = os.getenv("JPEG_ENCODER", "auto")  # auto | turbojpeg | opencv
+# Profiles requested within this many seconds are pre-encoded on every tick
+PROFILE_DEMAND_WINDOW = 10.0
+
+
+# -------------------------------
+# ENCODER BACKENDS
+# -------------------------------
+class OpenCVJpegEncoder:
+    name = "opencv"
+
+    def encode(self, frame, quality):
+        success, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        return buffer.tobytes() if success else None
+
+
+class TurboJpegEncoder:
+    """libjpeg-turbo through PyTurboJPEG (pip install PyTurboJPEG)"""
+    name = "turbojpeg"
+
+    def __init__(self):
+        from turbojpeg import TurboJPEG
+        self._jpeg = TurboJPEG()
+
+    def encode(self, frame, quality):
+        # PyTurboJPEG takes BGR input by default, matching OpenCV frames
+        return self._jpeg.encode(frame, quality=quality)
+
+
+def create_encoder(name=JPEG_ENCODER):
+    """Pick a JPEG encoder; 'auto' prefers libjpeg-turbo when it is installed"""
+    if name in ("auto", "turbojpeg"):
+        try:
+            return TurboJpegEncoder()
+        except Exception as e:
+            if name == "turbojpeg":
+                print(f"[ENCODER] turbojpeg unavailable ({e}); using OpenCV")
+    return OpenCVJpegEncoder()
+
+
+def resolve_profile(name):
+    """Return a known profile name, falling back to the default"""
+    return name if name in ENCODE_PROFILES else DEFAULT_PROFILE
+
+
+def encode_frame(frame, profile=DEFAULT_PROFILE, encoder=None):
+    """Resize (per profile) and JPEG-encode a single frame"""
+    settings = ENCODE_PROFILES[resolve_profile(profile)]
+    if settings["scale"] != 1.0:
+        height, width = frame.shape[:2]
+        size = (int(width * settings["scale"]), int(height * settings["scale"]))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return (encoder or _default_encoder()).encode(frame, settings["quality"])
+
+
+_encoder = None
+
+
+def _default_encoder():
+    global _encoder
+    if _encoder is None:
+        _encoder = create_encoder()
+    return _encoder
+
+
+# -------------------------------
+# ENCODE-ONCE FRAMES
+# -------------------------------
+class EncodedFrame:
+    """
+    One annotated frame plus its JPEG bytes per profile. Each profile is
+    encoded at most once and the bytes are shared by every viewer of it.
+    """
+
+    def __init__(self, frame, encoder=None, timestamp=None, meta=None):
+        self.frame = frame
+        self.timestamp = timestamp or time.time()
+        self.meta = meta or {}
+        self._encoder = encoder
+        self._jpeg = {}
+        self._lock = threading.Lock()
+
+    def is_encoded(self, profile):
+        return resolve_profile(profile) in self._jpeg
+
+    def jpeg(self, profile=DEFAULT_PROFILE):
+        profile = resolve_profile(profile)
+        data = self._jpeg.get(profile)
+        if data is None:
+            with self._lock:
+                data = self._jpeg.get(profile)
+                if data is None:
+                    data = encode_frame(self.frame, profile, self._encoder)
+                    self._jpeg[profile] = data
+        return data
+
+
+class FramePackager:
+    """
+    Wraps each processed frame in an EncodedFrame and pre-encodes the
+    profiles viewers are currently using, so encoding happens once per tick
+    on the worker thread rather than per viewer.
+    """
+
+    def __init__(self, encoder=None, default_profile=DEFAULT_PROFILE):
+        self.encoder = encoder or _default_encoder()
+        self.default_profile = resolve_profile(default_profile)
+        self._demand = {}
+        self._lock = threading.Lock()
+
+    def request(self, profile):
+        """Record that a viewer wants this profile; returns the resolved name"""
+        profile = resolve_profile(profile)
+        with self._lock:
+            self._demand[profile] = time.time()
+        return profile
+
+    def active_profiles(self):
+        cutoff = time.time() - PROFILE_DEMAND_WINDOW
+        with self._lock:
+            active = {p for p, seen in self._demand.items() if seen >= cutoff}
+        active.add(self.default_profile)
+        return active
+
+    def package(self, frame, **meta):
+        packet = EncodedFrame(frame, self.encoder, meta=meta)
+        for profile in self.active_profiles():
+            packet.jpeg(profile)
+        return packet
@@ -1,9 +1,13 @@
 # energy_logger.py
 import json
+import threading
 import time
 from datetime import datetime, timezone
 import redis
 import os
+from .notifications import NotificationBatcher, build_notification
+from .ingest import INGEST_ENABLED, WasteIngestor, make_record
+from .spool import SPOOL_DIR, SpoolLocked, WasteSpool
 
 POWER_RATINGS = {"lamp": 0.032, "screen": 0.03}
 COST_PER_KWH = {"lamp": 0.35, "screen": 0.33}
@@ -11,48 +15,97 @@ COST_PER_KWH = {"lamp": 0.35, "screen": 0.33}
 # Store all waste events for one "absence session"
 waste_session_records = []
 
-# Redis connection
-try:
-    redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        password=os.getenv('REDIS_PASSWORD', 'securepassword'),
-        decode_responses=True
-    )
-    redis_client.ping()
-    print("[REDIS] Connected successfully")
-except Exception as e:
-    print(f"[REDIS] Connection failed: {e}")
-    redis_client = None
-
-
-def log_waste_start(device, start_time):
+# Redis connection (opened on first use so importing the detector is cheap)
+REDIS_RETRY_INTERVAL = 30  # seconds between reconnect attempts after a failure
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 2.0))
+
+redis_client = None
+_redis_last_attempt = 0
+
+
+def get_redis_client():
+    """Return the shared Redis client, connecting lazily; None if unavailable."""
+    global redis_client, _redis_last_attempt
+    if redis_client is not None:
+        return redis_client
+    if time.time() - _redis_last_attempt < REDIS_RETRY_INTERVAL:
+        return None
+
+    _redis_last_attempt = time.time()
+    try:
+        client = redis.Redis(
+            host=os.getenv('REDIS_HOST', 'localhost'),
+            port=int(os.getenv('REDIS_PORT', 6379)),
+            password=os.getenv('REDIS_PASSWORD', 'securepassword'),
+            decode_responses=True,
+            # Bounded waits: notifications are sent from the detection path
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT
+        )
+        client.ping()
+        print("[REDIS] Connected successfully")
+        redis_client = client
+    except Exception as e:
+        print(f"[REDIS] Connection failed: {e}")
+    return redis_client
+
+
+# Waste-start notifications raised during one frame are written together
+notification_batcher = NotificationBatcher(get_redis_client)
+
+# Finalized waste events go to the local spool first, then to Postgres in
+# the background; an empty SPOOL_DIR keeps them in memory only. The spool
+# is opened on first use (get_spool) so importing the detector is cheap.
+waste_spool = None
+waste_ingestor = WasteIngestor(get_redis_client)
+_spool_lock = threading.Lock()
+_spool_unavailable = False
+
+
+def get_spool():
+    """Open the local spool once and hand it to the writer; None if not in use."""
+    global waste_spool, _spool_unavailable
+    with _spool_lock:
+        if waste_spool is not None or _spool_unavailable:
+            return waste_spool
+        if not SPOOL_DIR or not INGEST_ENABLED:
+            _spool_unavailable = True
+            return None
+        try:
+            waste_spool = WasteSpool(SPOOL_DIR)
+        except SpoolLocked as e:
+            print(f"{e}; waste events stay in memory until written")
+            _spool_unavailable = True
+            return None
+        waste_ingestor.spool = waste_spool
+        return waste_spool
+
+
+def start_ingest():
+    """Open the spool and start the writer if records from an earlier run are pending."""
+    spool = get_spool()
+    if spool is not None and spool.pending():
+        waste_ingestor.start()
+
+
+def log_waste_start(device, start_time, location_id=None):
     """Mark the start of a waste event (human absent but device still on)."""
     message = f"{device} left ON — tracking waste duration."
     print(f"[START] {message}")
     
-    # Push notification to Redis
-    if redis_client:
-        try:
-            notification = {
-                "id": f"notif_{int(time.time() * 1000)}",
-                "message": message,
-                "device": device,
-                "level": "warning",
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "read": False
-            }
-            # Push to Redis list (notifications queue)
-            redis_client.lpush('voltguard:notifications', json.dumps(notification))
-            # Publish to pub/sub channel for real-time updates
-            redis_client.publish('voltguard:notifications:new', json.dumps(notification))
-            print(f"[REDIS] Notification pushed: {message}")
-        except Exception as e:
-            print(f"[REDIS] Failed to push notification: {e}")
-
-
-def log_waste_end(device, start_time, end_time):
-    """Store end event data in memory (no saving yet)."""
+    # Queued for Redis; sent by flush_notifications()
+    notification_batcher.add(build_notification(
+        message, device=device, level="warning", location_id=location_id
+    ))
+
+
+def flush_notifications():
+    """Push every queued notification to Redis in one pipeline."""
+    return notification_batcher.flush()
+
+
+def log_waste_end(device, start_time, end_time, location_id=None, confidence=None):
+    """Store end event data in memory and queue it for the database."""
     duration = float(end_time) - float(start_time)
     duration_hours = duration / 3600
     kwh_wasted = POWER_RATINGS.get(device, 0.05) * duration_hours
@@ -60,12 +113,18 @@ def log_waste_end(device, start_time, end_time):
 
     data = {
         "name": device,
+        "location_id": location_id,
         "duration_hours": round(duration_hours, 4),
         "kwh_wasted": round(kwh_wasted, 5),
         "est_cost": round(est_cost, 4)
     }
 
     waste_session_records.append(data)
+    get_spool()
+    waste_ingestor.submit(make_record(
+        device, location_id, start_time, end_time, kwh_wasted, est_cost,
+        watts=POWER_RATINGS.get(device, 0.05) * 1000, confidence=confidence
+    ))
     print(f"[END] {device} wasted energy for {round(duration, 2)} seconds (queued for save).")
 
 
@@ -0,0 +1,163 @@
+"""
+Export best_max.pt to a faster CPU runtime and check the result.
+
+    python -m model.export --format onnx
+    python -m model.export --format onnx --int8
+    python -m model.export --format openvino --int8 --data path/to/data.yaml
+
+The exported model is then run next to the PyTorch one on a real frame
+(--image, or one from CAMERA_SOURCE) and must find the same boxes: same
+classes, IoU >= --min-iou, at most --max-unmatched left over.
+
+After exporting, select the runtime with INFERENCE_BACKEND=onnx|openvino
+(and INFERENCE_INT8=1 for the quantized variant).
+"""
+import argparse
+import os
+import shutil
+
+import numpy as np
+from ultralytics import YOLO
+
+from .backends import MODEL_PATH, weights_path
+
+
+def export_onnx(source, weights, imgsz, int8):
+    path = source.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if not int8:
+        return path
+
+    # Dynamic (weight-only) quantization needs no calibration data
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    target = weights_path("onnx", int8=True, base=weights)
+    quantize_dynamic(path, target, weight_type=QuantType.QUInt8)
+    return target
+
+
+def export_openvino(source, weights, imgsz, int8, data):
+    if int8 and not data:
+        raise SystemExit("OpenVINO INT8 export needs a calibration dataset (--data data.yaml)")
+    path = source.export(format="openvino", imgsz=imgsz, dynamic=True, int8=int8, data=data)
+
+    target = weights_path("openvino", int8=int8, base=weights)
+    if os.path.abspath(path) != os.path.abspath(target):
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.move(path, target)
+    return target
+
+
+def sample_frame(image=None):
+    """The --image file, or one frame from CAMERA_SOURCE (webcam, recording or URL)"""
+    import cv2
+
+    if image:
+        frame = cv2.imread(image)
+        if frame is None:
+            raise SystemExit(f"Cannot read sample image {image}")
+        return frame
+
+    from .replay import CAMERA_SOURCE, open_source
+    capture = open_source(CAMERA_SOURCE, realtime=False, loop=False)
+    try:
+        # Skip the first frames: webcams often return dark ones while adjusting
+        frame = None
+        for _ in range(5):
+            ok, latest = capture.read()
+            if not ok:
+                break
+            frame = latest
+    finally:
+        capture.release()
+    if frame is None:
+        raise SystemExit(f"No frame from CAMERA_SOURCE={CAMERA_SOURCE}; pass --image with a sample frame")
+    return frame
+
+
+def box_iou(a, b):
+    """IoU matrix between two sets of xyxy boxes"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_boxes(ref_xyxy, ref_cls, out_xyxy, out_cls, min_iou):
+    """Greedy one-to-one matching of same-class boxes; returns IoUs of the matched pairs"""
+    if not len(ref_xyxy) or not len(out_xyxy):
+        return []
+    iou = box_iou(ref_xyxy, out_xyxy)
+    iou[ref_cls[:, None] != out_cls[None, :]] = 0
+    matched = []
+    for flat in np.argsort(iou, axis=None)[::-1]:
+        i, j = np.unravel_index(flat, iou.shape)
+        if iou[i, j] < min_iou:
+            break
+        matched.append(float(iou[i, j]))
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return matched
+
+
+def verify(reference, exported_path, frame, min_iou=0.7, max_unmatched=0):
+    """
+    Compare the PyTorch and exported models on a real frame: class names,
+    then box count, classes and positions (same-class IoU >= min_iou).
+    Exits non-zero when more than max_unmatched boxes have no counterpart.
+    """
+    exported = YOLO(exported_path, task="detect")
+    if dict(exported.names) != dict(reference.names):
+        raise SystemExit(f"Class names differ after export: {exported.names} != {reference.names}")
+
+    ref = reference(frame, verbose=False)[0].boxes
+    out = exported(frame, verbose=False)[0].boxes
+    ref_xyxy, ref_cls = ref.xyxy.cpu().numpy(), ref.cls.cpu().numpy().astype(int)
+    out_xyxy, out_cls = out.xyxy.cpu().numpy(), out.cls.cpu().numpy().astype(int)
+    print(f"[EXPORT] names match ({len(reference.names)} classes); "
+          f"boxes: torch={len(ref_xyxy)} exported={len(out_xyxy)}")
+    if not len(ref_xyxy):
+        print("[EXPORT] The reference model found nothing in the sample frame, so box parity "
+              "is untested; use --image with objects in view")
+        return
+
+    matched = match_boxes(ref_xyxy, ref_cls, out_xyxy, out_cls, min_iou)
+    unmatched = len(ref_xyxy) + len(out_xyxy) - 2 * len(matched)
+    if matched:
+        print(f"[EXPORT] {len(matched)} box(es) matched, IoU min {min(matched):.3f} "
+              f"mean {sum(matched) / len(matched):.3f}")
+    if unmatched > max_unmatched:
+        raise SystemExit(f"[EXPORT] {unmatched} box(es) without a same-class match at IoU >= {min_iou} "
+                         f"(allowed: {max_unmatched})")
+    print("[EXPORT] Exported model matches the PyTorch model on the sample frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the VoltGuard detector")
+    parser.add_argument("--format", choices=("onnx", "openvino"), required=True)
+    parser.add_argument("--int8", action="store_true", help="Also quantize to INT8")
+    parser.add_argument("--data", help="Dataset YAML for INT8 calibration (OpenVINO)")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--image", help="Sample frame used to compare outputs (default: one from CAMERA_SOURCE)")
+    parser.add_argument("--min-iou", type=float, default=0.7,
+                        help="IoU a same-class box pair needs to count as a match")
+    parser.add_argument("--max-unmatched", type=int, default=0,
+                        help="Boxes allowed without a match (e.g. 1-2 for INT8)")
+    parser.add_argument("--weights", default=MODEL_PATH)
+    args = parser.parse_args()
+
+    # Before the (slow) export, so a missing sample fails fast
+    frame = sample_frame(args.image)
+    source = YOLO(args.weights)
+    if args.format == "onnx":
+        path = export_onnx(source, args.weights, args.imgsz, args.int8)
+    else:
+        path = export_openvino(source, args.weights, args.imgsz, args.int8, args.data)
+    print(f"[EXPORT] Wrote {path}")
+
+    verify(YOLO(args.weights), path, frame, args.min_iou, args.max_unmatched)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import threading
+from collections import deque
+
+
+class InferencePool:
+    """
+    Bounded worker pool for blocking frame processing (YOLO + encode).
+
+    Frames wait in a small queue with a drop-oldest policy: when every worker
+    is busy and the queue is full, the stalest pending frame is discarded so
+    the pool keeps working on fresh frames instead of falling behind the
+    camera. Results that finish out of order are dropped as stale.
+    """
+
+    def __init__(self, process, on_result=None, workers=1, max_queue=2, name="inference"):
+        self.process = process
+        self.on_result = on_result
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._threads = []
+        self._running = False
+        self._next_index = 0
+        self._last_emitted = -1
+
+        self.submitted = 0
+        self.dropped = 0
+        self.stale = 0
+        self.completed = 0
+        self.failed = 0
+
+    # -------------------------------
+    # LIFECYCLE
+    # -------------------------------
+    def start(self):
+        """Spawn the worker threads (no-op if already running)."""
+        if self._running:
+            return
+        self._running = True
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"[INFERENCE] {self.workers} worker(s) started, queue size {self.max_queue}")
+
+    def stop(self, timeout=2.0):
+        """Stop the workers; pending frames are discarded."""
+        with self._cond:
+            self._running = False
+            self._queue.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # -------------------------------
+    # DISPATCH
+    # -------------------------------
+    def submit(self, item):
+        """
+        Queue an item for processing. Never blocks; returns False if the
+        oldest pending item had to be dropped to make room.
+        """
+        with self._cond:
+            accepted = True
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+                accepted = False
+            self._queue.append((self._next_index, item))
+            self._next_index += 1
+            self.submitted += 1
+            self._cond.notify()
+        return accepted
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self._running)
+                if not self._running:
+                    return
+                index, item = self._queue.popleft()
+
+            try:
+                result = self.process(item)
+            except Exception as e:
+                print(f"[INFERENCE] Worker error: {e}")
+                with self._cond:
+                    self.failed += 1
+                continue
+
+            with self._cond:
+                self.completed += 1
+                if index < self._last_emitted:
+                    # A newer frame already finished on another worker
+                    self.stale += 1
+                    continue
+                self._last_emitted = index
+
+                # Publish under the lock so results leave in capture order
+                if result is not None and self.on_result is not None:
+                    self.on_result(result)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "queue_size": self.max_queue,
+                "queued": len(self._queue),
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "stale": self.stale,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
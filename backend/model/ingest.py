@@ -0,0 +1,415 @@
+"""
+Background writer that moves finalized waste records into waste_events.
+
+The detector hands records to WasteIngestor.submit(), which only appends
+to a bounded in-memory queue, so a slow or unreachable database never
+stalls a camera. One writer thread drains the queue in batches (up to
+INGEST_BATCH_SIZE records or every INGEST_FLUSH_INTERVAL seconds) and
+writes each batch with a single multi-row INSERT (execute_values), which
+also means one rollup-trigger run per batch instead of one per event.
+
+Records name their device and location the way the detector knows them
+("lamp", LOCATION_ID). The writer resolves them to device_catalog ids,
+creating the location/device rows the first time they are seen, and
+caches the mapping. After each committed batch it announces the new rows
+on Redis so the API servers drop their cached analytics.
+
+With a WasteSpool (model/spool.py) the queue lives on disk instead: submit()
+appends to the spool, the writer reads batches from its checkpoint and
+advances it after each commit, so nothing is dropped and records survive
+outages and restarts. Every record carries a stable event_id and rows
+that already exist are skipped, which makes replaying a batch harmless.
+A batch the database refuses is retried record by record, so only the
+records at fault are rejected.
+"""
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from .notifications import announce_waste_events
+
+DB_CONFIG = {
+    "dbname": os.getenv("PG_DATABASE", "mydatabase"),
+    "user": os.getenv("PG_USER", "postgres"),
+    "password": os.getenv("PG_PASSWORD", "lou"),
+    "host": os.getenv("PG_HOST", "127.0.0.1"),
+    "port": os.getenv("PG_PORT", "5432")
+}
+
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "1") == "1"
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 1000))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 200))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", 2.0))
+# Seconds to wait before retrying after the database was unreachable
+INGEST_RETRY_INTERVAL = float(os.getenv("INGEST_RETRY_INTERVAL", 10))
+# Location used for records from a camera without a LOCATION_ID
+INGEST_DEFAULT_LOCATION = os.getenv("INGEST_DEFAULT_LOCATION", "Unassigned")
+
+# Connection and schema problems (e.g. waste_events missing mid-migration)
+# are retried; anything else means some record in the batch is bad
+RETRYABLE_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, psycopg2.ProgrammingError)
+
+
+def make_record(device, location_id, start_time, end_time, kwh, cost, watts, confidence=None):
+    """A finalized waste event in the form submit() expects (times in epoch seconds)"""
+    return {
+        "event_id": str(uuid.uuid4()),
+        "device": device,
+        "location_id": location_id,
+        "start_time": float(start_time),
+        "end_time": float(end_time),
+        "kwh": kwh,
+        "cost": cost,
+        "watts": watts,
+        "confidence": confidence,
+    }
+
+
+def _duration_raw(seconds):
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02}:{minutes:02}:{secs:02}"
+
+
+class WasteIngestor:
+    """
+    Bounded queue + writer thread for waste records. Without a spool, the
+    oldest pending record is dropped when the queue is full, like the
+    inference pool does with frames; stats() reports how many.
+    """
+
+    def __init__(self, get_client=None, config=DB_CONFIG, max_queue=INGEST_QUEUE_SIZE,
+                 batch_size=INGEST_BATCH_SIZE, flush_interval=INGEST_FLUSH_INTERVAL,
+                 retry_interval=INGEST_RETRY_INTERVAL, enabled=INGEST_ENABLED, spool=None):
+        self.get_client = get_client
+        self.spool = spool
+        self.config = config
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.enabled = enabled
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._thread = None
+        self._running = False
+        self._conn = None
+        self._location_ids = {}  # LOCATION_ID as sent -> locations.location_id
+        self._device_ids = {}  # (location key, device name) -> device_id
+
+        self.submitted = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.retries = 0
+
+    # -------------------------------
+    # LIFECYCLE
+    # -------------------------------
+    def start(self):
+        """Start the writer thread (no-op if already running)."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._writer, name="waste-ingest", daemon=True)
+        self._thread.start()
+        print(f"[INGEST] Writer started, queue size {self.max_queue}, batch size {self.batch_size}")
+
+    def stop(self, timeout=10.0):
+        """Write what is still queued (best effort within timeout) and stop."""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+        self._close_connection()
+        if self.spool is not None:
+            self.spool.flush()
+            if self.spool.pending():
+                print(f"[INGEST] Stopped with {self.spool.pending()} record(s) left in the spool")
+            return
+        with self._cond:
+            if self._queue:
+                print(f"[INGEST] Stopped with {len(self._queue)} record(s) unwritten")
+
+    # -------------------------------
+    # DISPATCH
+    # -------------------------------
+    def submit(self, record):
+        """
+        Queue a record for writing. Never blocks; returns False if it was not
+        accepted as-is (ingestion disabled, or the oldest record was dropped).
+        """
+        if not self.enabled:
+            return False
+        if not self._running:
+            self.start()
+        if self.spool is not None:
+            self.spool.append(record)
+            with self._cond:
+                self.submitted += 1
+                if self.spool.pending() >= self.batch_size:
+                    self._cond.notify()
+            return True
+        with self._cond:
+            accepted = True
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+                accepted = False
+            self._queue.append(record)
+            self.submitted += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        return accepted
+
+    def _next_batch(self):
+        """
+        Wait for a full batch or the flush interval; returns (records, spool
+        position), with no records once stopped and drained.
+        """
+        if self.spool is not None:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self.spool.pending() >= self.batch_size or not self._running,
+                    timeout=min(self.flush_interval, self.spool.fsync_interval))
+            self.spool.sync_if_due()
+            return self.spool.read(self.batch_size)
+
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._queue) >= self.batch_size or not self._running,
+                                timeout=self.flush_interval)
+            count = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(count)], None
+
+    def _requeue(self, batch):
+        """Put a failed batch back at the front, keeping the queue bound"""
+        with self._cond:
+            room = self.max_queue - len(self._queue)
+            if room < len(batch):
+                self.dropped += len(batch) - room
+                batch = batch[len(batch) - room:] if room > 0 else []
+            self._queue.extendleft(reversed(batch))
+
+    def _writer(self):
+        while True:
+            batch, position = self._next_batch()
+            if not batch:
+                if not self._running:
+                    return
+                continue
+            try:
+                bad = self._write(batch)
+                if bad:
+                    if self.spool is not None:
+                        print(f"[INGEST] Kept {len(bad)} refused record(s) in the spool's rejected log")
+                        self.spool.reject(bad, position, stored=len(batch) - len(bad))
+                    else:
+                        print(f"[INGEST] Dropped {len(bad)} refused record(s)")
+                    with self._cond:
+                        self.failed += len(bad)
+                elif self.spool is not None:
+                    self.spool.commit(batch, position)
+            except RETRYABLE_ERRORS as e:
+                print(f"[INGEST] Database unavailable or not migrated, retrying in {self.retry_interval}s: {e}")
+                self._close_connection()
+                # Spooled records stay behind the checkpoint and are read again
+                if self.spool is None:
+                    self._requeue(batch)
+                with self._cond:
+                    self.retries += 1
+                    if not self._running:
+                        return
+                    self._cond.wait_for(lambda: not self._running, timeout=self.retry_interval)
+            except Exception as e:
+                if self.spool is not None:
+                    print(f"[INGEST] Rejected batch of {len(batch)}, kept in the spool's rejected log: {e}")
+                    self.spool.reject(batch, position)
+                else:
+                    print(f"[INGEST] Dropped batch of {len(batch)}: {e}")
+                with self._cond:
+                    self.failed += len(batch)
+
+    # -------------------------------
+    # DATABASE
+    # -------------------------------
+    def _connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(**self.config)
+        return self._conn
+
+    def _close_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
+
+    def _forget_ids(self):
+        self._location_ids.clear()
+        self._device_ids.clear()
+
+    def _resolve_location(self, cur, location_id):
+        """locations.location_id for a LOCATION_ID that is either a UUID or a name"""
+        key = location_id or INGEST_DEFAULT_LOCATION
+        if key in self._location_ids:
+            return self._location_ids[key]
+        try:
+            uuid.UUID(str(key))
+        except ValueError:
+            pass
+        else:
+            cur.execute("SELECT location_id FROM locations WHERE location_id = %s", (key,))
+            row = cur.fetchone()
+            if row:
+                self._location_ids[key] = row[0]
+                return row[0]
+
+        cur.execute("SELECT location_id FROM locations WHERE name = %s ORDER BY created_at LIMIT 1",
+                    (key,))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("""
+                INSERT INTO locations (name, description)
+                VALUES (%s, 'Created by the detector ingest')
+                RETURNING location_id
+            """, (key,))
+            row = cur.fetchone()
+            print(f"[INGEST] Registered location '{key}'")
+        self._location_ids[key] = row[0]
+        return row[0]
+
+    def _resolve_device(self, cur, record):
+        key = (record["location_id"] or INGEST_DEFAULT_LOCATION, record["device"])
+        device_id = self._device_ids.get(key)
+        if device_id is not None:
+            return device_id
+
+        location_id = self._resolve_location(cur, record["location_id"])
+        cur.execute("""
+            INSERT INTO device_catalog (location_id, device_name, avg_wattage_rating)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (location_id, device_name) DO NOTHING
+        """, (location_id, record["device"], int(record["watts"])))
+        cur.execute("SELECT device_id FROM device_catalog WHERE location_id = %s AND device_name = %s",
+                    (location_id, record["device"]))
+        device_id = cur.fetchone()[0]
+        self._device_ids[key] = device_id
+        return device_id
+
+    def _rows(self, cur, batch):
+        rows = []
+        for record in batch:
+            seconds = max(record["end_time"] - record["start_time"], 0)
+            rows.append((
+                record.get("event_id") or str(uuid.uuid4()),
+                self._resolve_device(cur, record),
+                datetime.fromtimestamp(record["start_time"], timezone.utc),
+                _duration_raw(seconds),
+                timedelta(seconds=seconds),
+                round(record["kwh"], 4),
+                round(record["cost"], 2),
+                record["confidence"],
+            ))
+        return rows
+
+    def _insert(self, batch):
+        """One transaction for the batch; returns the number of rows inserted"""
+        conn = self._connection()
+        try:
+            with conn.cursor() as cur:
+                # Replayed records are already stored: skip them (the rollup
+                # trigger only sees rows actually inserted)
+                execute_values(cur, """
+                    INSERT INTO waste_events
+                        (event_id, device_id, detection_timestamp, duration_raw, duration_interval,
+                         kwh_consumed, estimated_cost_php, confidence_score)
+                    VALUES %s
+                    ON CONFLICT (event_id, detection_timestamp) DO NOTHING
+                """, self._rows(cur, batch), page_size=len(batch))
+                inserted = cur.rowcount
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass  # connection is broken; reopened on the next batch
+            # Ids cached in the rolled-back transaction were never committed,
+            # and a device or location may have been deleted under us
+            self._forget_ids()
+            raise
+        return inserted
+
+    def _write(self, batch):
+        """
+        Insert a batch; returns the records the database refused. If the
+        batch as a whole fails on its data, it is retried record by record
+        so only the bad ones are left out. Retryable errors propagate.
+        """
+        bad = []
+        try:
+            inserted = self._insert(batch)
+        except RETRYABLE_ERRORS:
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"[INGEST] Refused record {batch[0].get('event_id')}: {e}")
+                return batch
+            print(f"[INGEST] Batch of {len(batch)} refused ({e}), retrying record by record")
+            inserted = 0
+            for record in batch:
+                try:
+                    inserted += self._insert([record])
+                except RETRYABLE_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"[INGEST] Refused record {record.get('event_id')}: {e}")
+                    bad.append(record)
+
+        stored = len(batch) - len(bad)
+        with self._cond:
+            self.written += inserted
+            self.batches += 1
+        print(f"[INGEST] Wrote {inserted} waste event(s)"
+              + (f", {stored - inserted} already stored" if inserted < stored else ""))
+        if inserted:
+            self._announce(inserted)
+        return bad
+
+    def _announce(self, count):
+        client = self.get_client() if self.get_client else None
+        if client is None:
+            return
+        try:
+            announce_waste_events(client, count)
+        except Exception as e:
+            print(f"[REDIS] Failed to announce waste events: {e}")
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                "enabled": self.enabled,
+                "running": self._running,
+                "queue_size": self.max_queue,
+                "queued": len(self._queue),
+                "submitted": self.submitted,
+                "dropped": self.dropped,
+                "written": self.written,
+                "batches": self.batches,
+                "failed": self.failed,
+                "retries": self.retries,
+            }
+        if self.spool is not None:
+            stats["spool"] = self.spool.stats()
+        return stats
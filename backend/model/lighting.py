@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+LIGHT_ON_THRESHOLD = 250  # grayscale level that counts as a lit pixel
+
+
+def center_regions(xyxy, shape):
+    """
+    Central half of each box (the same h//4:3h//4, w//4:3w//4 window the
+    per-crop check used), clipped to the frame. Returns int arrays
+    (x1, y1, x2, y2).
+    """
+    height, width = shape[:2]
+    xyxy = np.asarray(xyxy, dtype=np.int64).reshape(-1, 4)
+    x1 = np.clip(xyxy[:, 0], 0, width)
+    y1 = np.clip(xyxy[:, 1], 0, height)
+    x2 = np.clip(xyxy[:, 2], 0, width)
+    y2 = np.clip(xyxy[:, 3], 0, height)
+    w = np.maximum(x2 - x1, 0)
+    h = np.maximum(y2 - y1, 0)
+    return x1 + w // 4, y1 + h // 4, x1 + 3 * w // 4, y1 + 3 * h // 4
+
+
+def _region_sums(integral, x1, y1, x2, y2):
+    return integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+
+
+def analyze_lights(frame, xyxy, threshold=LIGHT_ON_THRESHOLD, gray=None):
+    """
+    Decide ON/OFF for every box in one pass.
+
+    The frame is converted to grayscale once and thresholded; an integral
+    image of the lit-pixel mask then gives the lit-pixel count of each box's
+    center region in four lookups, so "max > threshold" becomes
+    "count > 0" with no per-box crop or Python loop. Returns a bool array
+    aligned with xyxy (and therefore with boxes.cls).
+    """
+    if len(xyxy) == 0:
+        return np.zeros(0, dtype=bool)
+    if gray is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    lit = cv2.integral((gray > threshold).astype(np.uint8))
+    x1, y1, x2, y2 = center_regions(xyxy, gray.shape)
+    return _region_sums(lit, x1, y1, x2, y2) > 0
+
+
+def center_brightness(frame, xyxy, gray=None):
+    """Mean grayscale brightness of each box's center region (0 for empty boxes)"""
+    if len(xyxy) == 0:
+        return np.zeros(0)
+    if gray is None:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    sums = cv2.integral(gray, sdepth=cv2.CV_64F)
+    x1, y1, x2, y2 = center_regions(xyxy, gray.shape)
+    area = (x2 - x1) * (y2 - y1)
+    totals = _region_sums(sums, x1, y1, x2, y2)
+    return np.divide(totals, area, out=np.zeros(len(area)), where=area > 0)
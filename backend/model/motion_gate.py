@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Mean absolute difference (0-255 grayscale) on the downscaled frame above
+# which the scene counts as changed
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", 4.0))
+# Full inference is forced at least this often (seconds). Keep it well under
+# HUMAN_ABSENT_THRESHOLD so presence timers stay accurate.
+MOTION_FORCE_INTERVAL = float(os.getenv("MOTION_FORCE_INTERVAL", 5.0))
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "1") != "0"
+MOTION_GATE_SIZE = (64, 48)
+
+
+class MotionGate:
+    """
+    Cheap frame-difference check that decides whether YOLO needs to run.
+
+    Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+    thumbnail of the last frame that was fully inferred. Comparing against
+    that reference (rather than the previous frame) means slow drifts
+    still add up and eventually trigger inference.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, force_interval=MOTION_FORCE_INTERVAL,
+                 size=MOTION_GATE_SIZE, enabled=MOTION_GATE_ENABLED):
+        self.threshold = threshold
+        self.force_interval = force_interval
+        self.size = size
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._reference = None
+        self._last_full = 0.0
+        self.inferred = 0
+        self.skipped = 0
+        self.last_score = 0.0
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_infer(self, frame, now=None):
+        """True if the frame changed enough (or the forced interval elapsed)"""
+        now = time.time() if now is None else now
+        thumb = self._thumbnail(frame)
+
+        with self._lock:
+            if self._reference is not None:
+                self.last_score = float(np.mean(cv2.absdiff(thumb, self._reference)))
+
+            if (not self.enabled
+                    or self._reference is None
+                    or now - self._last_full >= self.force_interval
+                    or self.last_score > self.threshold):
+                self._reference = thumb
+                self._last_full = now
+                self.inferred += 1
+                return True
+
+            self.skipped += 1
+            return False
+
+    def reset(self):
+        """Force the next frame through the model"""
+        with self._lock:
+            self._reference = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "inferred": self.inferred,
+                "skipped": self.skipped,
+                "last_score": round(self.last_score, 2),
+            }
@@ -0,0 +1,219 @@
+"""
+Multi-camera detection engine.
+
+Watches one camera per location and runs a single batched YOLO call per
+tick over all live cameras, keeping presence/waste state per location_id.
+
+    python -m model.multi_camera --sources "living-room=0,office=rtsp://cam/stream"
+    python -m model.multi_camera --sources "lab=recordings/lab.mp4,hall=recordings/hall_frames/"
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+
+from . import detection
+from .replay import open_source
+from .scheduler import SCHEDULER_ACTIVE_FPS, AdaptiveRateScheduler
+
+
+def parse_sources(spec):
+    """
+    Parse camera sources into [(location_id, source), ...].
+
+    Accepts either a path to a JSON file containing
+    [{"location_id": ..., "source": ...}, ...] or a comma-separated list of
+    location_id=source pairs. Numeric sources are treated as device indices.
+    """
+    if not spec:
+        return []
+
+    if spec.endswith(".json") and os.path.exists(spec):
+        with open(spec) as f:
+            entries = json.load(f)
+        return [(str(e["location_id"]), _coerce_source(e["source"])) for e in entries]
+
+    sources = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        location_id, sep, source = entry.partition("=")
+        if not sep:
+            raise ValueError(f"Camera source must be location_id=source, got: {entry}")
+        sources.append((location_id.strip(), _coerce_source(source.strip())))
+    return sources
+
+
+def parse_caps(spec):
+    """Parse per-camera FPS caps ("location_id=fps,...") into a dict"""
+    caps = {}
+    for entry in (spec or "").split(","):
+        location_id, sep, fps = entry.strip().partition("=")
+        if sep:
+            caps[location_id.strip()] = float(fps)
+    return caps
+
+
+def _coerce_source(source):
+    if isinstance(source, int):
+        return source
+    return int(source) if str(source).isdigit() else source
+
+
+class CameraStream:
+    """One capture source bound to a location and its RoomState"""
+
+    def __init__(self, location_id, source, max_fps=None):
+        self.location_id = location_id
+        self.source = source
+        self.room = detection.RoomState(location_id)
+        self.scheduler = AdaptiveRateScheduler(self.room, max_fps=max_fps)
+        self.capture = None
+        self.failures = 0
+
+    def open(self):
+        if self.capture is None or not self.capture.isOpened():
+            self.capture = open_source(self.source)
+        return self.capture.isOpened()
+
+    def grab(self):
+        """Latch a frame without decoding it (keeps cameras in step)"""
+        if not self.open():
+            return False
+        grabbed = self.capture.grab()
+        if not grabbed:
+            # Stream dropped or file ended: reopen on the next tick
+            self.failures += 1
+            self.release()
+        return grabbed
+
+    def retrieve(self):
+        success, frame = self.capture.retrieve()
+        return frame if success else None
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class MultiCameraEngine:
+    """Batched inference over several CameraStreams"""
+
+    def __init__(self, sources, fps=SCHEDULER_ACTIVE_FPS, on_frame=None, caps=None):
+        caps = caps or {}
+        self.streams = [
+            CameraStream(location_id, source, max_fps=caps.get(location_id, fps))
+            for location_id, source in sources
+        ]
+        self.fps = fps
+        self.on_frame = on_frame
+        self._running = False
+        self._grabbed = 0
+
+    def tick(self):
+        """Grab one frame per camera, run one batched YOLO call over the due ones"""
+        # Grab everything first so frames are as close in time as possible,
+        # then pay the decode cost only for cameras whose scheduler is due.
+        grabbed = [s for s in self.streams if s.grab()]
+        self._grabbed = len(grabbed)
+        live = []
+        for stream in grabbed:
+            if not stream.scheduler.due():
+                continue
+            frame = stream.retrieve()
+            if frame is not None:
+                live.append((stream, frame))
+
+        if not live:
+            return []
+
+        # Only cameras whose scene changed go into the batch; static rooms
+        # reuse their previous detections.
+        changed = [(stream, frame) for stream, frame in live
+                   if detection.needs_inference(frame, stream.room)]
+        if changed:
+            batch = detection.detect_batch([frame for _, frame in changed])
+            for (stream, _), detections in zip(changed, batch):
+                stream.room.last_detections = detections
+
+        annotated = []
+        for stream, frame in live:
+            frame = detection.apply_detections(frame, stream.room.last_detections, stream.room)
+            annotated.append((stream, frame))
+            if self.on_frame is not None:
+                self.on_frame(stream, frame)
+        return annotated
+
+    def run(self):
+        """Run ticks until stop() is called; pacing comes from the per-camera schedulers"""
+        self._running = True
+        print(f"[ENGINE] Watching {len(self.streams)} camera(s), up to {self.fps} FPS each")
+
+        while self._running:
+            self.tick()
+            if not self._grabbed:
+                # No camera delivered a frame: back off before retrying
+                time.sleep(1.0)
+
+    def stop(self):
+        self._running = False
+
+    def release(self):
+        for stream in self.streams:
+            stream.release()
+
+    def status(self):
+        """Presence and active waste per location"""
+        return {
+            s.location_id: {
+                "human_present": s.room.human_present,
+                "active_waste": sorted(s.room.active_waste_events),
+                "failures": s.failures,
+                "motion_gate": s.room.gate.stats(),
+                "scheduler": s.scheduler.stats(),
+            }
+            for s in self.streams
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VoltGuard multi-camera detection")
+    parser.add_argument("--sources", default=os.getenv("CAMERA_SOURCES", ""),
+                        help="location_id=source pairs or a JSON file (default: $CAMERA_SOURCES)")
+    parser.add_argument("--fps", type=float, default=float(os.getenv("ENGINE_FPS", SCHEDULER_ACTIVE_FPS)),
+                        help="Default per-camera FPS cap (default: $ENGINE_FPS or SCHEDULER_ACTIVE_FPS; "
+                             "a lower cap also limits the scheduler's active rate)")
+    parser.add_argument("--caps", default=os.getenv("CAMERA_MAX_FPS", ""),
+                        help="Per-camera FPS caps as location_id=fps pairs (default: $CAMERA_MAX_FPS)")
+    parser.add_argument("--show", action="store_true", help="Display annotated frames")
+    args = parser.parse_args()
+
+    sources = parse_sources(args.sources)
+    if not sources:
+        parser.error("no camera sources configured")
+
+    def show(stream, frame):
+        cv2.imshow(f"VoltGuard - {stream.location_id}", frame)
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            engine.stop()
+
+    engine = MultiCameraEngine(sources, fps=args.fps, on_frame=show if args.show else None,
+                               caps=parse_caps(args.caps))
+    detection.logger.start_ingest()
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.release()
+        cv2.destroyAllWindows()
+        detection.logger.waste_ingestor.stop()
+        print("VoltGuard engine stopped.")
+
+
+if __name__ == "__main__":
+    main()
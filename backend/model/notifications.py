@@ -0,0 +1,199 @@
+"""
+Notification publishing shared by the detector and the API servers.
+
+A batch of notifications is written in a single MULTI/EXEC pipeline: one
+LPUSH of every item onto the recent-notifications list, an LTRIM down to
+NOTIFICATION_RETENTION and a PUBLISH per item on the live channel. The
+list therefore never grows past the retention limit, and readers never
+see an item in the list that has not also been announced.
+
+NotificationSnapshot is the read side used by the API servers for the
+connect-time sync. announce_waste_events() tells them new rows landed in
+waste_events so cached analytics are dropped.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+NOTIFICATIONS_KEY = 'voltguard:notifications'
+NOTIFICATIONS_CHANNEL = 'voltguard:notifications:new'
+# Announced after new rows land in waste_events (cached analytics go stale)
+WASTE_EVENTS_CHANNEL = 'voltguard:waste_events:new'
+NOTIFICATION_RETENTION = int(os.getenv('NOTIFICATION_RETENTION', 100))
+# Most recent notifications sent to a client when it connects
+NOTIFICATION_SYNC_LIMIT = int(os.getenv('NOTIFICATION_SYNC_LIMIT', 50))
+
+
+def build_notification(message, device=None, level="info", location_id=None, read=False):
+    """A notification record in the format the dashboard expects"""
+    notification = {
+        "id": f"notif_{int(time.time() * 1000)}_{device or 'manual'}",
+        "message": message,
+        "device": device,
+        "level": level,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "read": read
+    }
+    if location_id is not None:
+        notification["location_id"] = location_id
+    return notification
+
+
+def _queue_writes(pipe, notifications, retention, broadcast):
+    payloads = [json.dumps(n) for n in notifications]
+    # LPUSH puts the last argument at the head, so oldest-first keeps the
+    # list newest-first
+    pipe.lpush(NOTIFICATIONS_KEY, *payloads)
+    pipe.ltrim(NOTIFICATIONS_KEY, 0, retention - 1)
+    if broadcast:
+        for payload in payloads:
+            pipe.publish(NOTIFICATIONS_CHANNEL, payload)
+    return pipe
+
+
+def publish(client, notifications, retention=NOTIFICATION_RETENTION, broadcast=True):
+    """Store and announce notifications (oldest first) with a sync Redis client"""
+    if not notifications:
+        return
+    with client.pipeline(transaction=True) as pipe:
+        _queue_writes(pipe, notifications, retention, broadcast).execute()
+
+
+async def publish_async(client, notifications, retention=NOTIFICATION_RETENTION, broadcast=True):
+    """Store and announce notifications (oldest first) with a redis.asyncio client"""
+    if not notifications:
+        return
+    async with client.pipeline(transaction=True) as pipe:
+        await _queue_writes(pipe, notifications, retention, broadcast).execute()
+
+
+def announce_waste_events(client, count):
+    """Tell the API servers that `count` new waste events were committed"""
+    client.publish(WASTE_EVENTS_CHANNEL, json.dumps({
+        "count": count,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }))
+
+
+class NotificationBatcher:
+    """
+    Collects notifications raised while processing one frame (e.g. every
+    lit device going to waste when the room empties) and writes them with a
+    single publish() on flush(). get_client returns a sync Redis client or
+    None; if Redis is unavailable the pending batch is dropped.
+    """
+
+    def __init__(self, get_client, retention=NOTIFICATION_RETENTION):
+        self.get_client = get_client
+        self.retention = retention
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, notification):
+        with self._lock:
+            self._pending.append(notification)
+
+    def flush(self):
+        """Write everything queued so far; returns the number of notifications sent"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        client = self.get_client()
+        if client is None:
+            print(f"[REDIS] Unavailable, dropped {len(batch)} notification(s)")
+            return 0
+        try:
+            publish(client, batch, self.retention)
+        except Exception as e:
+            print(f"[REDIS] Failed to push notifications: {e}")
+            return 0
+        print(f"[REDIS] Pushed {len(batch)} notification(s)")
+        return len(batch)
+
+
+def _parse_timestamp(value):
+    """ISO timestamp as an aware datetime (naive values are taken as UTC)"""
+    try:
+        ts = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+class NotificationSnapshot:
+    """
+    In-process copy of the most recent notifications (oldest first) for the
+    connect-time sync. It is loaded from Redis once and shared by every
+    connecting client until invalidate() is called (on publish or clear),
+    so a wave of reconnecting dashboards costs one LRANGE, not one each.
+    """
+
+    def __init__(self, limit=NOTIFICATION_SYNC_LIMIT):
+        self.limit = limit
+        self._items = None  # [(parsed timestamp, notification)], oldest first
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        self._items = None
+        self._version += 1
+
+    async def _load(self, client):
+        items = self._items
+        if items is not None:
+            self.hits += 1
+            return items
+
+        async with self._lock:
+            # Another connect may have refreshed it while we waited
+            if self._items is not None:
+                self.hits += 1
+                return self._items
+            self.misses += 1
+            version = self._version
+            raw = await client.lrange(NOTIFICATIONS_KEY, 0, self.limit - 1)
+            items = []
+            for payload in reversed(raw):
+                notification = json.loads(payload)
+                items.append((_parse_timestamp(notification.get("timestamp")), notification))
+            # Don't cache a read that raced with a publish
+            if version == self._version:
+                self._items = items
+            return items
+
+    async def batch(self, client, since=None):
+        """
+        Payload for the notifications_batch event: notifications newer than
+        the `since` timestamp (all of them if omitted), oldest first, plus
+        the cursor the client should send next time.
+        """
+        items = await self._load(client)
+        cutoff = _parse_timestamp(since) if since else None
+        if cutoff is not None:
+            # Items with unreadable timestamps are always delivered
+            selected = [n for ts, n in items if ts is None or ts > cutoff]
+            # The client missed more than the snapshot holds
+            oldest = items[0][0] if items else None
+            truncated = len(items) >= self.limit and oldest is not None and oldest > cutoff
+        else:
+            selected = [n for _, n in items]
+            truncated = False
+
+        cursor = selected[-1].get("timestamp") if selected else since
+        return {"notifications": selected, "cursor": cursor, "truncated": truncated}
+
+    def stats(self):
+        return {
+            "cached": self._items is not None,
+            "size": len(self._items or ()),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
@@ -0,0 +1,126 @@
+"""
+Recorded footage as a camera: video files and image directories.
+
+ReplaySource has the subset of the cv2.VideoCapture interface the
+pipeline uses (isOpened/grab/retrieve/read/release/get), so detection,
+the API servers and the multi-camera engine run unchanged on a
+recording instead of a webcam. Frames are served as fast as they are
+asked for, or paced to the recording's frame rate with realtime=True.
+
+open_source() picks the right capture for a CAMERA_SOURCE value: a
+device index ("0") opens a webcam, an image directory or video file is
+replayed, anything else (e.g. an RTSP URL) goes straight to OpenCV.
+"""
+import os
+import time
+
+import cv2
+
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "0")
+# Pace replayed footage to its frame rate (1) or run flat out (0)
+REPLAY_REALTIME = os.getenv("REPLAY_REALTIME", "1") == "1"
+REPLAY_LOOP = os.getenv("REPLAY_LOOP", "0") == "1"
+# Frame rate assumed for image directories
+REPLAY_IMAGE_FPS = float(os.getenv("REPLAY_IMAGE_FPS", 15))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class ReplaySource:
+    def __init__(self, path, realtime=REPLAY_REALTIME, loop=REPLAY_LOOP, fps=None):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+
+        if os.path.isdir(path):
+            self._images = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            self._video = None
+            self.fps = fps or REPLAY_IMAGE_FPS
+        else:
+            self._images = None
+            self._video = cv2.VideoCapture(path)
+            self.fps = fps or self._video.get(cv2.CAP_PROP_FPS) or REPLAY_IMAGE_FPS
+
+        self._index = -1  # image directories: frame latched by grab()
+        self._started = None
+        self.frames = 0
+        self.paced_s = 0.0  # total time grab() spent sleeping for realtime pacing
+
+    def isOpened(self):
+        if self._images is not None:
+            return bool(self._images)
+        return self._video is not None and self._video.isOpened()
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT and self._images is not None:
+            return len(self._images)
+        return self._video.get(prop) if self._video is not None else 0
+
+    def _pace(self):
+        """Sleep until this frame is due at the recording's frame rate"""
+        if self._started is None:
+            self._started = time.perf_counter()
+        if self.realtime:
+            due = self._started + self.frames / self.fps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+                self.paced_s += delay
+
+    def _rewind(self):
+        self._index = -1
+        if self._video is not None:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def grab(self):
+        """Latch the next frame without decoding it; False at the end"""
+        if not self.isOpened():
+            return False
+        self._pace()
+        grabbed = self._grab()
+        if not grabbed and self.loop and self.frames:
+            self._rewind()
+            grabbed = self._grab()
+        if grabbed:
+            self.frames += 1
+        return grabbed
+
+    def _grab(self):
+        if self._images is not None:
+            if self._index + 1 >= len(self._images):
+                return False
+            self._index += 1
+            return True
+        return self._video.grab()
+
+    def retrieve(self):
+        """Decode the latched frame"""
+        if self._images is not None:
+            frame = cv2.imread(self._images[self._index]) if self._index >= 0 else None
+            return frame is not None, frame
+        return self._video.retrieve()
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        self._images = None
+
+
+def open_source(source=CAMERA_SOURCE, **replay_options):
+    """cv2.VideoCapture for device indices and URLs, ReplaySource for recordings"""
+    if isinstance(source, int) or str(source).isdigit():
+        return cv2.VideoCapture(int(source))
+    if os.path.isdir(source) or os.path.isfile(source):
+        return ReplaySource(source, **replay_options)
+    return cv2.VideoCapture(source)
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+
+# Detection rate while someone is in the room or the absence countdown runs
+SCHEDULER_ACTIVE_FPS = float(os.getenv("SCHEDULER_ACTIVE_FPS", 10))
+# Detection rate once the room is confirmed empty and every lit device is
+# already being tracked as waste (nothing left to decide until someone returns)
+SCHEDULER_IDLE_FPS = float(os.getenv("SCHEDULER_IDLE_FPS", 0.5))
+
+
+class AdaptiveRateScheduler:
+    """
+    Decides which captured frames get processed for one room.
+
+    The capture loop calls due() for every frame it grabs; frames that are
+    not due are counted as dropped. The rate follows the room's state:
+    active_fps while a person is present (which includes the absence
+    countdown), idle_fps once the room is empty and all waste events are
+    running. max_fps caps both (per-camera hardware limits).
+    """
+
+    def __init__(self, room, active_fps=SCHEDULER_ACTIVE_FPS, idle_fps=SCHEDULER_IDLE_FPS,
+                 max_fps=None):
+        self.room = room
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.max_fps = max_fps
+
+        self._lock = threading.Lock()
+        self._next_due = 0.0
+        self.mode = "active"
+        self.processed = 0
+        self.dropped = 0
+        self.late = 0
+
+    def _room_is_idle(self):
+        room = self.room
+        if room.human_present:
+            return False
+        # Snapshot: inference workers may be updating the log concurrently
+        lit = [name for name, record in list(room.device_log.items()) if record["is_on"]]
+        return all(name in room.active_waste_events for name in lit)
+
+    @property
+    def current_fps(self):
+        fps = self.idle_fps if self.mode == "idle" else self.active_fps
+        if self.max_fps:
+            fps = min(fps, self.max_fps)
+        return fps
+
+    def due(self, now=None):
+        """True if this frame should be processed; otherwise it is counted as dropped"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            mode = "idle" if self._room_is_idle() else "active"
+            if mode != self.mode:
+                self.mode = mode
+                # Waking up must not wait out the remainder of an idle interval
+                self._next_due = min(self._next_due, now)
+
+            if now < self._next_due:
+                self.dropped += 1
+                return False
+
+            interval = 1.0 / self.current_fps if self.current_fps else 0.0
+            if now - self._next_due > interval:
+                # More than a whole interval behind: restart the cadence from now
+                if self._next_due:
+                    self.late += 1
+                self._next_due = now
+            self._next_due += interval
+            self.processed += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "current_fps": self.current_fps,
+                "active_fps": self.active_fps,
+                "idle_fps": self.idle_fps,
+                "max_fps": self.max_fps,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "late": self.late,
+            }
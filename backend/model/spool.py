@@ -0,0 +1,340 @@
+"""
+Append-only local spool (write-ahead log) for finalized waste events.
+
+Every record is appended to the spool before anything touches the
+network, so an edge node keeps its billing data through Postgres or
+Redis outages and restarts. Records are JSON lines in numbered segment
+files (waste-00000001.jsonl, ...) that rotate at SPOOL_SEGMENT_BYTES.
+Appends are flushed to the OS immediately but fsync'd in batches: after
+SPOOL_FSYNC_BATCH records or SPOOL_FSYNC_INTERVAL seconds, whichever
+comes first, so durability costs one fsync per batch rather than one per
+event.
+
+checkpoint.json records how far the spool has been committed to the
+database. WasteIngestor reads batches from the checkpoint onward and
+advances it only after the INSERT commits; fully committed segments are
+deleted. Replaying a batch twice (crash between commit and checkpoint)
+is harmless because each record carries a stable event_id and the
+INSERT skips ids that already exist.
+
+A spool has a single appender: the directory is locked (spool.lock) for
+as long as a WasteSpool has it open, and a second process opening the
+same SPOOL_DIR fails with SpoolLocked instead of interleaving segments.
+
+    python -m model.spool            # show pending records
+    python -m model.spool --replay   # drain the spool into Postgres and exit
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SPOOL_DIR = os.getenv("SPOOL_DIR", "waste_spool")
+SPOOL_FSYNC_BATCH = int(os.getenv("SPOOL_FSYNC_BATCH", 32))
+SPOOL_FSYNC_INTERVAL = float(os.getenv("SPOOL_FSYNC_INTERVAL", 1.0))
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", 8 * 1024 * 1024))
+
+SEGMENT_NAME = re.compile(r"^waste-(\d{8})\.jsonl$")
+CHECKPOINT = "checkpoint.json"
+REJECTED = "rejected.jsonl"
+LOCK_FILE = "spool.lock"
+
+
+class SpoolLocked(RuntimeError):
+    """The spool directory is already open in another process"""
+
+
+def _segment_name(seq):
+    return f"waste-{seq:08d}.jsonl"
+
+
+def _fsync_dir(path):
+    """Make a rename/create in `path` durable (no-op where unsupported)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WasteSpool:
+    def __init__(self, directory=SPOOL_DIR, fsync_batch=SPOOL_FSYNC_BATCH,
+                 fsync_interval=SPOOL_FSYNC_INTERVAL, segment_bytes=SPOOL_SEGMENT_BYTES):
+        self.directory = directory
+        self.fsync_batch = max(1, int(fsync_batch))
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        self.appended = 0
+        self.committed = 0
+        self.fsyncs = 0
+        self.rejected = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._acquire_dir_lock()
+        self._checkpoint = self._load_checkpoint()
+        self._open_tail()
+        self._pending = self._count_pending()
+        if self._pending:
+            print(f"[SPOOL] {self._pending} uncommitted record(s) in {directory}")
+
+    # -------------------------------
+    # SEGMENTS + CHECKPOINT
+    # -------------------------------
+    def _segments(self):
+        """Sequence numbers of the segment files on disk, oldest first"""
+        seqs = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                seqs.append(int(match.group(1)))
+        return sorted(seqs)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _acquire_dir_lock(self):
+        """Exclusive lock on the directory, held until close()"""
+        fd = os.open(self._path(LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is None:
+            return fd
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise SpoolLocked(f"[SPOOL] {self.directory} is in use by another process") from None
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        return fd
+
+    def _load_checkpoint(self):
+        try:
+            with open(self._path(CHECKPOINT)) as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except (OSError, ValueError, KeyError):
+            segments = self._segments()
+            return (segments[0] if segments else 1), 0
+
+    def _save_checkpoint(self, position):
+        tmp = self._path(CHECKPOINT + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"segment": position[0], "offset": position[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(CHECKPOINT))
+        _fsync_dir(self.directory)
+
+    def _open_tail(self):
+        """Append to the newest segment, cutting off a record torn by a crash"""
+        segments = self._segments()
+        self._seq = segments[-1] if segments else max(self._checkpoint[0], 1)
+        path = self._path(_segment_name(self._seq))
+        if os.path.exists(path):
+            with open(path, "rb+") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    print(f"[SPOOL] Discarding {len(data) - end} byte(s) of a torn record in {path}")
+                    f.truncate(end)
+        self._file = open(path, "ab")
+        _fsync_dir(self.directory)
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._seq += 1
+        self._file = open(self._path(_segment_name(self._seq)), "ab")
+        _fsync_dir(self.directory)
+
+    def _count_pending(self):
+        count = 0
+        for seq in self._segments():
+            if seq < self._checkpoint[0]:
+                continue
+            with open(self._path(_segment_name(seq)), "rb") as f:
+                if seq == self._checkpoint[0]:
+                    f.seek(self._checkpoint[1])
+                count += sum(1 for line in f if line.endswith(b"\n"))
+        return count
+
+    # -------------------------------
+    # WRITE SIDE
+    # -------------------------------
+    def append(self, record):
+        """Write one record; it is durable after the next fsync (see sync_if_due())."""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with self._lock:
+            if self._file.tell() + len(line) > self.segment_bytes and self._file.tell() > 0:
+                self._rotate()
+            self._file.write(line)
+            # Visible to the reader right away; fsync'd in batches
+            self._file.flush()
+            self._unsynced += 1
+            self._pending += 1
+            self.appended += 1
+            if self._unsynced >= self.fsync_batch:
+                self._sync()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self.fsyncs += 1
+        self._last_sync = time.monotonic()
+
+    def flush(self):
+        """fsync everything appended so far"""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+
+    def sync_if_due(self):
+        """fsync records older than fsync_interval; call periodically"""
+        with self._lock:
+            if self._unsynced and time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+            if self._lock_fd is not None:
+                # Closing the descriptor releases the flock
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    # -------------------------------
+    # READ SIDE (single consumer)
+    # -------------------------------
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def read(self, limit):
+        """
+        Up to `limit` uncommitted records from the checkpoint onward, and the
+        position to pass to commit() once they are stored: (segment, offset,
+        lines consumed).
+        """
+        with self._lock:
+            tail_seq = self._seq
+        records = []
+        lines = 0
+        seq, offset = self._checkpoint
+        while len(records) < limit and seq <= tail_seq:
+            path = self._path(_segment_name(seq))
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    while len(records) < limit:
+                        line = f.readline()
+                        if not line.endswith(b"\n"):
+                            break  # end of segment (or a record still being written)
+                        offset += len(line)
+                        lines += 1
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            print(f"[SPOOL] Skipping unreadable record in {path}")
+            if len(records) < limit and seq < tail_seq:
+                seq, offset = seq + 1, 0
+            else:
+                break
+
+        position = (seq, offset, lines)
+        if lines and not records:
+            # Nothing but unreadable lines: step over them
+            self.commit(records, position)
+        return records, position
+
+    def commit(self, records, position):
+        """Advance the checkpoint past records returned by read()"""
+        self._advance(position, len(records))
+
+    def _advance(self, position, stored):
+        seq, offset, lines = position
+        self._save_checkpoint((seq, offset))
+        with self._lock:
+            self._checkpoint = (seq, offset)
+            self._pending = max(self._pending - lines, 0)
+            self.committed += stored
+        # Segments before the checkpoint are fully stored
+        for old in self._segments():
+            if old >= seq:
+                break
+            os.remove(self._path(_segment_name(old)))
+
+    def reject(self, records, position, stored=0):
+        """
+        Move records the database refused to rejected.jsonl and skip past the
+        batch they came from; `stored` of its other records were written.
+        """
+        with open(self._path(REJECTED), "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        with self._lock:
+            self.rejected += len(records)
+        self._advance(position, stored)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "segment": self._seq,
+                "pending": self._pending,
+                "appended": self.appended,
+                "committed": self.committed,
+                "rejected": self.rejected,
+                "fsyncs": self.fsyncs,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or drain the local waste-event spool ($SPOOL_DIR)")
+    parser.add_argument("--replay", action="store_true", help="Write every pending record to Postgres, then exit")
+    args = parser.parse_args()
+
+    # The detector's own spool and writer; the directory lock keeps a
+    # running detector from appending at the same time
+    from .energy_logger import get_spool, waste_ingestor
+    waste_spool = get_spool()
+    if waste_spool is None:
+        parser.error("the spool is not available (SPOOL_DIR empty, INGEST_ENABLED=0 or locked)")
+
+    if args.replay and waste_spool.pending():
+        waste_ingestor.start()
+        try:
+            while waste_spool.pending():
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        waste_ingestor.stop()
+    waste_spool.close()
+    print(json.dumps(waste_spool.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import time
+
+
+class FrameBroadcaster:
+    """
+    Runs capture + detection once per tick on a background thread and keeps
+    the latest result, so every viewer (Socket.IO tab, MJPEG stream) shares
+    one inference pass instead of driving the camera itself.
+
+    If dispatch is given, each produced item is handed to it (e.g. an
+    InferencePool) instead of being published directly; the consumer is then
+    responsible for calling publish() with the processed frame.
+
+    If a scheduler is given (with a grab callable), the loop grabs every
+    camera frame and only produces the ones the scheduler marks as due,
+    instead of pacing at a fixed fps.
+    """
+
+    def __init__(self, produce, fps=15.0, dispatch=None, grab=None, scheduler=None,
+                 name="frame-broadcaster"):
+        self.produce = produce
+        self.fps = fps
+        self.dispatch = dispatch
+        self.grab = grab
+        self.scheduler = scheduler
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._async_waiters = []
+        self._latest = None
+        self._seq = 0
+        self._timestamp = 0.0
+        self._thread = None
+        self._running = False
+
+    # -------------------------------
+    # LIFECYCLE
+    # -------------------------------
+    def start(self):
+        """Start the producer thread (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Signal the producer thread to exit and wait for it."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    # -------------------------------
+    # PUBLISHING
+    # -------------------------------
+    def publish(self, data):
+        """Store a new frame and wake every waiting viewer."""
+        with self._cond:
+            self._seq += 1
+            self._latest = data
+            self._timestamp = time.time()
+            waiters, self._async_waiters = self._async_waiters, []
+            self._cond.notify_all()
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def _run(self):
+        interval = 1.0 / self.fps if self.fps else 0.0
+        if self.scheduler is not None:
+            print(f"[STREAM] {self.name} started (adaptive rate)")
+        else:
+            print(f"[STREAM] {self.name} started at {self.fps} FPS")
+
+        while self._running:
+            tick_start = time.monotonic()
+
+            if self.scheduler is not None:
+                try:
+                    grabbed = self.grab()
+                except Exception as e:
+                    print(f"[STREAM] Grab error: {e}")
+                    grabbed = False
+                if not grabbed:
+                    time.sleep(1.0)
+                    continue
+                if not self.scheduler.due():
+                    continue
+
+            if not self._emit():
+                # Camera unavailable: back off instead of spinning on it
+                time.sleep(1.0)
+                continue
+
+            if self.scheduler is None:
+                remaining = interval - (time.monotonic() - tick_start)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+        print(f"[STREAM] {self.name} stopped")
+
+    def _emit(self):
+        try:
+            data = self.produce()
+        except Exception as e:
+            print(f"[STREAM] Producer error: {e}")
+            data = None
+
+        if data is None:
+            return False
+        if self.dispatch is not None:
+            self.dispatch(data)
+        else:
+            self.publish(data)
+        return True
+
+    # -------------------------------
+    # CONSUMING
+    # -------------------------------
+    def latest(self):
+        """Return (seq, data) for the most recently published frame."""
+        with self._cond:
+            return self._seq, self._latest
+
+    @property
+    def last_published(self):
+        return self._timestamp
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """Block until a frame newer than after_seq is published (threads)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq or not self._running, timeout)
+            return self._seq, self._latest
+
+    async def next_frame(self, after_seq=0, timeout=None):
+        """Await a frame newer than after_seq without blocking the event loop."""
+        with self._cond:
+            if self._seq > after_seq:
+                return self._seq, self._latest
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._async_waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Timed out or cancelled: don't leave the waiter behind while
+            # no frames are being published (camera down)
+            with self._cond:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+        return self.latest()
+
+
+async def push_frames(broadcaster, send, fps, timeout=2.0, before_wait=None):
+    """
+    Server-push loop shared by the API servers: awaits send(seq, data) for
+    every new frame from broadcaster, at most fps times a second, until
+    cancelled. before_wait runs at the start of each tick.
+    """
+    interval = 1.0 / fps
+    loop = asyncio.get_running_loop()
+    seq = 0
+
+    while True:
+        started = loop.time()
+        if before_wait is not None:
+            before_wait()
+        new_seq, data = await broadcaster.next_frame(seq, timeout=timeout)
+
+        if data is not None and new_seq != seq:
+            seq = new_seq
+            await send(seq, data)
+
+        await asyncio.sleep(max(interval - (loop.time() - started), 0))
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,202 @@
+"""
+Offline benchmark of the detection pipeline on recorded footage.
+
+Feeds a video file or image directory through the same code the live
+server runs per frame (detection.analyze_frame + encode_frame) and
+reports per-stage timings, FPS, CPU% and peak RSS as JSON, so backends
+(INFERENCE_BACKEND, INFERENCE_INT8), encoders (JPEG_ENCODER), profiles
+and motion-gate settings can be compared without a webcam.
+
+    python -m model.video_bench recordings/office.mp4
+    python -m model.video_bench recordings/frames/ --realtime --max-frames 300
+    INFERENCE_BACKEND=onnx python -m model.video_bench office.mp4 --json onnx.json
+
+Stages: decode (grab + retrieve), motion_gate, inference (YOLO),
+lights (ON/OFF analysis), annotation (the rest of the presence/waste
+update and drawing) and encode (resize + JPEG for --profile). With
+--realtime, the time spent waiting for a frame to be due is reported as
+pacing and left out of decode.
+Waste events raised by the footage are not spooled, stored, announced
+or written to waste_summary.json: run() swaps the energy logger's entry
+points for no-ops while it runs.
+"""
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+
+from . import detection
+from .backends import INFERENCE_BACKEND, INFERENCE_INT8
+from .encoder import DEFAULT_PROFILE, ENCODE_PROFILES, create_encoder, encode_frame
+from .replay import ReplaySource
+
+STAGES = ("pacing", "decode", "motion_gate", "inference", "lights", "annotation", "encode")
+# energy_logger calls made by detection that would leave waste events behind
+LOGGER_CALLS = ("log_waste_start", "log_waste_end", "flush_notifications", "save_all_once")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(samples):
+    """Timing summary in milliseconds for one stage"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(pct):
+        return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(50) * 1000, 3),
+        "p95_ms": round(pick(95) * 1000, 3),
+        "total_s": round(sum(ordered), 3),
+    }
+
+
+class StageTimer:
+    """Wraps detection's module-level stage functions to time each call"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._originals = {}
+
+    def wrap(self, module, attr, stage):
+        original = getattr(module, attr)
+        self._originals[(module, attr)] = original
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - started)
+
+        setattr(module, attr, timed)
+
+    def silence(self, module, attr):
+        """Replace module.attr with a no-op until restore()"""
+        self._originals[(module, attr)] = getattr(module, attr)
+        setattr(module, attr, lambda *args, **kwargs: None)
+
+    def restore(self):
+        for (module, attr), original in self._originals.items():
+            setattr(module, attr, original)
+
+    def last(self, stage, since_count):
+        """Time spent in `stage` by calls made after since_count samples"""
+        return sum(self.samples[stage][since_count:])
+
+
+def run(source, profile=DEFAULT_PROFILE, max_frames=None, gate=True):
+    room = detection.RoomState("benchmark")
+    room.gate.enabled = gate
+    encoder = create_encoder()
+    timer = StageTimer()
+    # analyze_frame looks these up at call time, so the wrappers sit
+    # inside the unmodified pipeline
+    timer.wrap(detection, "needs_inference", "motion_gate")
+    timer.wrap(detection, "detect_batch", "inference")
+    timer.wrap(detection, "analyze_lights", "lights")
+    for attr in LOGGER_CALLS:
+        timer.silence(detection.logger, attr)
+
+    frames = 0
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    try:
+        while max_frames is None or frames < max_frames:
+            started = time.perf_counter()
+            paced = source.paced_s
+            if not source.grab():
+                break
+            ok, frame = source.retrieve()
+            if not ok or frame is None:
+                break
+            paced = source.paced_s - paced
+            timer.samples["decode"].append(time.perf_counter() - started - paced)
+            if source.realtime:
+                timer.samples["pacing"].append(paced)
+
+            counts = {stage: len(timer.samples[stage]) for stage in ("motion_gate", "inference", "lights")}
+            started = time.perf_counter()
+            annotated, _ = detection.analyze_frame(frame, room)
+            analyze = time.perf_counter() - started
+            nested = sum(timer.last(stage, count) for stage, count in counts.items())
+            timer.samples["annotation"].append(analyze - nested)
+
+            started = time.perf_counter()
+            encode_frame(annotated, profile, encoder)
+            timer.samples["encode"].append(time.perf_counter() - started)
+            frames += 1
+    finally:
+        timer.restore()
+
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+    return {
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "fps": round(frames / wall, 2) if wall else None,
+        "cpu_percent": round(cpu / wall * 100, 1) if wall else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "inference_runs": len(timer.samples["inference"]),
+        "motion_gate": room.gate.stats(),
+        "stages": {stage: summarize(timer.samples[stage]) for stage in STAGES},
+        "encoder": encoder.name,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detection pipeline on a recording")
+    parser.add_argument("source", help="Video file or directory of images")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Pace frames to the recording's frame rate instead of running flat out")
+    parser.add_argument("--fps", type=float, default=None, help="Frame rate for image directories")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(ENCODE_PROFILES))
+    parser.add_argument("--no-gate", action="store_true", help="Run YOLO on every frame")
+    parser.add_argument("--no-warmup", action="store_true", help="Include model loading in the timings")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    source = ReplaySource(args.source, realtime=args.realtime, loop=False, fps=args.fps)
+    if not source.isOpened():
+        parser.error(f"cannot open {args.source}")
+
+    if not args.no_warmup:
+        detection.warmup()
+
+    report = {
+        "source": args.source,
+        "realtime": args.realtime,
+        "backend": INFERENCE_BACKEND,
+        "int8": INFERENCE_INT8,
+        "profile": args.profile,
+        "motion_gate_enabled": not args.no_gate,
+        **run(source, args.profile, args.max_frames, gate=not args.no_gate),
+    }
+    source.release()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+In-process result cache for the MCP analytics tools.
+
+The chatbot asks the same aggregate questions over and over, and each one
+scans waste_events. Tool results are cached per tool + arguments with a
+TTL and LRU eviction:
+
+    @mcp.tool()
+    @tool_cache.cached()
+    async def get_top_offending_devices(limit: int = 5) -> str:
+        ...
+
+Arguments are normalised through the tool's signature, so f(5) and
+f(limit=5) share an entry. invalidate() drops everything; the server calls
+it when a new batch of waste events is announced on Redis.
+"""
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", 300))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 256))
+
+
+class ToolCache:
+    def __init__(self, ttl=TOOL_CACHE_TTL, max_entries=TOOL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        # Bumped by invalidate() so results computed before it are not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """(True, value) on a fresh hit, (False, None) otherwise"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, entry[1]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, ttl=None, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.invalidations += 1
+
+    def cached(self, ttl=None):
+        """Decorator for async tools returning strings; error strings are not cached"""
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = (func.__name__, tuple(sorted(bound.arguments.items())))
+
+                found, value = self.get(key)
+                if found:
+                    return value
+                generation = self._generation
+                value = await func(*args, **kwargs)
+                if not (isinstance(value, str) and value.startswith("Error")):
+                    self.set(key, value, ttl, generation)
+                return value
+
+            return wrapper
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+tool_cache = ToolCache()
@@ -6,13 +6,16 @@ from pathlib import Path
 import uvicorn
 import signal
 import base64
-import redis
+import redis.asyncio as aioredis
 import json
 import asyncio
 import os
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from model.check import get_frame as get_video_frame, stats
+from model.stream import FrameBroadcaster, push_frames
+from model.notifications import NOTIFICATIONS_KEY, NOTIFICATIONS_CHANNEL
+from model.notifications import build_notification, publish_async, NotificationSnapshot
 
 app = FastAPI()
 
@@ -34,245 +37,210 @@ sio = socketio.AsyncServer(
 # Wrap with ASGI app
 socket_app = socketio.ASGIApp(sio, app)
 
-# Redis connection
-try:
-    redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        password=os.getenv('REDIS_PASSWORD', 'securepassword'),
-        decode_responses=True
-    )
-    redis_client.ping()
-    print("[REDIS] Connected successfully")
-except Exception as e:
-    print(f"[REDIS] Connection failed: {e}")
-    redis_client = None
+# Redis: one async connection pool; redis_client is set once startup has
+# confirmed the server is reachable
+redis_pool = aioredis.BlockingConnectionPool(
+    host=os.getenv('REDIS_HOST', 'localhost'),
+    port=int(os.getenv('REDIS_PORT', 6379)),
+    password=os.getenv('REDIS_PASSWORD', 'securepassword'),
+    decode_responses=True,
+    max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 20)),
+    timeout=5
+)
+redis_client = None
+notification_listener = None
+
+async def connect_redis():
+    global redis_client
+    client = aioredis.Redis(connection_pool=redis_pool)
+    try:
+        await client.ping()
+        redis_client = client
+        print("[REDIS] Connected successfully")
+    except Exception as e:
+        print(f"[REDIS] Connection failed: {e}")
 
 # THIS BROADCASTS THE LIVE NOTIFICATIONS
 # Redis Pub/Sub listener
+# Recent notifications for the connect-time sync, dropped whenever a new
+# one is announced
+notification_snapshot = NotificationSnapshot()
+
 async def listen_for_notifications():
-    """Listen to Redis pub/sub for new notifications and broadcast to all connected clients"""
+    """Broadcast each notification published on Redis to all clients as it arrives"""
     if not redis_client:
         return
     
-    pubsub = redis_client.pubsub()
-    pubsub.subscribe('voltguard:notifications:new')
-    
-    print("[REDIS] Listening for notifications...")
-    
     while True:
         try:
-            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
-            if message and message['type'] == 'message':
-                notification = json.loads(message['data'])
-                # Broadcast to all connected Socket.IO clients
-                await sio.emit('notification', notification)
-                print(f"[BROADCAST] Notification sent to all clients: {notification['message']}")
-            await asyncio.sleep(0.1)  # Non-blocking sleep
+            async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(NOTIFICATIONS_CHANNEL)
+                # Anything published while we were not subscribed is unseen
+                notification_snapshot.invalidate()
+                print("[REDIS] Listening for notifications...")
+                
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    notification_snapshot.invalidate()
+                    notification = json.loads(message['data'])
+                    # Broadcast to all connected Socket.IO clients
+                    await sio.emit('notification', notification)
+                    print(f"[BROADCAST] Notification sent to all clients: {notification['message']}")
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"[ERROR] Redis listener error: {e}")
-            await asyncio.sleep(1)  # Wait before retrying
+            await asyncio.sleep(1)  # Wait before resubscribing
+
+# Background producer: one capture + detection pass per tick for all viewers
+FRAME_WAIT_TIMEOUT = 2.0
+
+def produce_jpeg_frame():
+    frame_bytes, _ = get_video_frame()
+    return frame_bytes
+
+VIDEO_TARGET_FPS = float(os.getenv('VIDEO_TARGET_FPS', 15))
+FRAME_PROFILE = 'dashboard'  # get_video_frame encodes this profile only
+
+frame_broadcaster = FrameBroadcaster(produce_jpeg_frame, fps=VIDEO_TARGET_FPS)
+viewer_seq = {}  # sid -> last frame seq sent to that client
+push_tasks = {}  # sid -> asyncio task streaming frames to that client
 
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
     print(f"Client connected: {sid}")
     
-    # Send existing notifications to newly connected client
+    # Send the notifications this client missed as a single message; a
+    # reconnecting client passes the cursor of the last one it has seen
     if redis_client:
         try:
-            notifications = redis_client.lrange('voltguard:notifications', 0, 49)  # Get last 50
-            for notif_str in reversed(notifications):  # Reverse to get chronological order
-                notification = json.loads(notif_str)
-                await sio.emit('notification', notification, room=sid)
+            since = auth.get('since') if isinstance(auth, dict) else None
+            batch = await notification_snapshot.batch(redis_client, since)
+            await sio.emit('notifications_batch', batch, room=sid)
         except Exception as e:
             print(f"[ERROR] Failed to send existing notifications: {e}")
 
 @sio.event
 async def disconnect(sid):
+    viewer_seq.pop(sid, None)
+    task = push_tasks.pop(sid, None)
+    if task:
+        task.cancel()
     print(f"Client disconnected: {sid}")
 
 @sio.event
 async def get_frame(sid, data):
-    frame_bytes, current_stats = get_video_frame()
+    seq, frame_bytes = await frame_broadcaster.next_frame(
+        viewer_seq.get(sid, 0), timeout=FRAME_WAIT_TIMEOUT
+    )
     
     if frame_bytes:
-        frame_b64 = base64.b64enco from fastapi import FastAPI
-        from fastapi.middleware.cors import CORSMiddleware
-        import socketio
-        import sys
-        from pathlib import Path
-        import uvicorn
-        import signal
-        import base64
-        import redis
-        import json
-        import asyncio
-        import os
-        from concurrent.futures import ThreadPoolExecutor
-        from datetime import datetime, timezone
-        import time
-        
-        sys.path.insert(0, str(Path(__file__).parent.parent))
-        from model.check import get_frame as get_video_frame, stats
-        
-        app = FastAPI()
-        
-        app.add_middleware(
-            CORSMiddleware,
-            allow_origins=["*"],
-            allow_credentials=True,
-            allow_methods=["*"],
-            allow_headers=["*"],
-        )
-        
-        sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
-        socket_app = socketio.ASGIApp(sio, app)
-        
-        # Redis connection
-        try:
-            redis_client = redis.Redis(
-                host=os.getenv('REDIS_HOST', 'localhost'),
-                port=int(os.getenv('REDIS_PORT', 6379)),
-                password=os.getenv('REDIS_PASSWORD', 'securepassword'),
-                decode_responses=True
-            )
-            redis_client.ping()
-            print("[REDIS] Connected successfully")
-        except Exception as e:
-            print(f"[REDIS] Connection failed: {e}")
-            redis_client = None
-        
-        # Thread pool for blocking Redis operations
-        executor = ThreadPoolExecutor(max_workers=1)
-        
-        # ✅ FIXED: Proper async Redis listener
-        async def listen_for_notifications():
-            """Listen to Redis pub/sub and broadcast notifications"""
-            if not redis_client:
-                return
-            
-            def _blocking_listener():
-                pubsub = redis_client.pubsub()
-                pubsub.subscribe('voltguard:notifications:new')
-                print("[REDIS] Listening for notifications...")
-                
-                for message in pubsub.listen():
-                    if message and message['type'] == 'message':
-                        try:
-                            notification = json.loads(message['data'])
-                            asyncio.run_coroutine_threadsafe(
-                                sio.emit('notification', notification),
-                                asyncio.get_event_loop()
-                            )
-                            print(f"[BROADCAST] {notification['message']}")
-                        except Exception as e:
-                            print(f"[ERROR] Broadcast failed: {e}")
-            
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(executor, _blocking_listener)
-        
-        @sio.event
-        async def connect(sid, environ):
-            print(f"[CONNECT] Client {sid}")
-            
-            if redis_client:
-                try:
-                    notifications = redis_client.lrange('voltguard:notifications', 0, 49)
-                    notification_list = [json.loads(n) for n in reversed(notifications)]
-                    
-                    await sio.emit('notifications_batch', {
-                        'notifications': notification_list,
-                        'count': len(notification_list)
-                    }, room=sid)
-                except Exception as e:
-                    print(f"[ERROR] {e}")
-        
-        @sio.event
-        async def disconnect(sid):
-            print(f"[DISCONNECT] Client {sid}")
-        
-        @sio.event
-        async def get_frame(sid, data):
-            frame_bytes, current_stats = get_video_frame()
-            
-            if frame_bytes:
-                frame_b64 = base64.b64encode(frame_bytes).decode('utf-8')
-                await sio.emit('frame', {'image': frame_b64, 'stats': current_stats}, room=sid)
-            else:
-                await sio.emit('error', {'message': 'Failed to grab frame'}, room=sid)
-        
-        @app.get("/stats")
-        def get_stats():
-            return stats
-        
-        @app.get("/notifications")
-        def get_notifications(limit: int = 50):
-            if not redis_client:
-                return {"error": "Redis not available"}
-            try:
-                notifications = redis_client.lrange('voltguard:notifications', 0, limit - 1)
-                return [json.loads(n) for n in notifications]
-            except Exception as e:
-                return {"error": str(e)}
-        
-        # ✅ NEW: Manual notification sender
-        @app.post("/notifications/send")
-        def send_notification(message: str, device: str = None, level: str = "info"):
-            if not redis_client:
-                return {"error": "Redis not available"}
-            
-            try:
-                notification = {
-                    "id": f"notif_{int(time.time() * 1000)}_{device or 'manual'}",
-                    "message": message,
-                    "device": device,
-                    "level": level,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "read": False
-                }
-                
-                redis_client.lpush('voltguard:notifications', json.dumps(notification))
-                redis_client.ltrim('voltguard:notifications', 0, 99)
-                redis_client.publish('voltguard:notifications:new', json.dumps(notification))
-                
-                return {"status": "sent", "notification": notification}
-            except Exception as e:
-                return {"error": str(e)}
-        
-        @app.delete("/notifications")
-        def clear_notifications():
-            if not redis_client:
-                return {"error": "Redis not available"}
-            try:
-                redis_client.delete('voltguard:notifications')
-                return {"status": "cleared"}
-            except Exception as e:
-                return {"error": str(e)}
-        
-        @app.on_event("startup")
-        async def startup_event():
-            if redis_client:
-                existing_count = redis_client.llen('voltguard:notifications')
-                
-                if existing_count == 0:
-                    # Add dummy notifications...
-                    # ...existing code...
-                    pass
-                
-                asyncio.create_task(listen_for_notifications())
-        
-        @app.on_event("shutdown")
-        def shutdown_event():
-            print("Shutting down...")
-            executor.shutdown(wait=False)
+        viewer_seq[sid] = seq
+        frame_b64 = base64.b64encode(frame_bytes).decode('utf-8')
+        await sio.emit('frame', {'image': frame_b64, 'stats': stats}, room=sid)
+    else:
+        await sio.emit('error', {'message': 'Failed to grab frame'}, room=sid)
+
+async def push_frames_to(sid, fps, binary):
+    """Stream frames to one client at the negotiated rate until cancelled"""
+    async def send(seq, frame_bytes):
+        if binary:
+            await sio.emit('frame_binary', {
+                'meta': {'seq': seq, 'timestamp': frame_broadcaster.last_published,
+                         'profile': FRAME_PROFILE, 'stats': stats},
+                'image': frame_bytes
+            }, room=sid)
+        else:
+            await sio.emit('frame', {
+                'image': base64.b64encode(frame_bytes).decode('utf-8'),
+                'stats': stats
+            }, room=sid)
+    
+    await push_frames(frame_broadcaster, send, fps, timeout=FRAME_WAIT_TIMEOUT)
+
+@sio.event
+async def subscribe_frames(sid, data):
+    """
+    Server-push mode, same protocol as main.py; frames come in the one
+    profile this server encodes. Returns the negotiated settings as ack.
+    """
+    data = data or {}
+    fps = max(min(float(data.get('fps', VIDEO_TARGET_FPS)), VIDEO_TARGET_FPS), 0.1)
+    binary = bool(data.get('binary', True))
+    
+    task = push_tasks.pop(sid, None)
+    if task:
+        task.cancel()
+    push_tasks[sid] = asyncio.create_task(push_frames_to(sid, fps, binary))
+    return {'fps': fps, 'profile': FRAME_PROFILE, 'binary': binary}
+
+@sio.event
+async def unsubscribe_frames(sid, data=None):
+    task = push_tasks.pop(sid, None)
+    if task:
+        task.cancel()
+    return {'status': 'unsubscribed'}
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+@app.get("/notifications")
+async def get_notifications(limit: int = 50):
+    if not redis_client:
+        return {"error": "Redis not available"}
+    try:
+        notifications = await redis_client.lrange(NOTIFICATIONS_KEY, 0, limit - 1)
+        return [json.loads(n) for n in notifications]
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/notifications/send")
+async def send_notification(message: str, device: str = None, level: str = "info"):
+    if not redis_client:
+        return {"error": "Redis not available"}
+    
+    try:
+        notification = build_notification(message, device=device, level=level)
+        # List push, trim to retention and pub/sub announce in one round trip
+        await publish_async(redis_client, [notification])
+        notification_snapshot.invalidate()
         
-        if __name__ == "__main__":
-            uvicorn.run(socket_app, host="0.0.0.0", port=8000, log_level="info")
+        return {"status": "sent", "notification": notification}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.delete("/notifications")
+async def clear_notifications():
+    if not redis_client:
+        return {"error": "Redis not available"}
+    try:
+        await redis_client.delete(NOTIFICATIONS_KEY)
+        notification_snapshot.invalidate()
+        return {"status": "cleared"}
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.on_event("startup")
+async def startup_event():
+    global notification_listener
+    frame_broadcaster.start()
+    await connect_redis()
+    if redis_client:
+        notification_listener = asyncio.create_task(listen_for_notifications())
+
+@app.on_event("shutdown")
+async def shutdown_event():
     """Cleanup on shutdown"""
     print("Shutting down VoltGuard API...")
-    from model.check import camera
-    if camera:
-        camera.release()
+    if notification_listener:
+        notification_listener.cancel()
+    await redis_pool.disconnect()
+    frame_broadcaster.stop()
+    from model import check
+    if check.camera:
+        check.camera.release()
     import cv2
     cv2.destroyAllWindows()
 
@@ -70,38 +70,57 @@ export default function NotificationListener({ onNewNotification }) {
   const [bannerNotification, setBannerNotification] = useState(null);
   const socketRef = useRef();
   const receivedNotificationIds = useRef(new Set()); // Track received notification IDs
+  const cursorRef = useRef(null); // Timestamp of the newest notification received
 
   useEffect(() => {
+    // Returns false for notifications this client already has
+    const receive = (notification) => {
+      if (receivedNotificationIds.current.has(notification.id)) {
+        console.log("Duplicate notification ignored:", notification.id);
+        return false;
+      }
+
+      receivedNotificationIds.current.add(notification.id);
+      if (notification.timestamp && (!cursorRef.current || notification.timestamp > cursorRef.current)) {
+        cursorRef.current = notification.timestamp;
+      }
+
+      // Add to notifications list
+      setNotifications((prev) => [notification, ...prev]);
+
+      // Trigger parent callback if provided
+      if (onNewNotification) {
+        onNewNotification(notification);
+      }
+      return true;
+    };
+
     socketRef.current = io("http://localhost:8000", {
       path: "/socket.io/",
       transports: ["websocket", "polling"],
+      // Evaluated on every (re)connect so the server only sends what we missed
+      auth: (cb) => cb(cursorRef.current ? { since: cursorRef.current } : {}),
     });
 
     socketRef.current.on("connect", () => {
       console.log("Connected to notification service");
     });
 
+    // Backlog sent once on connect, oldest first; receive() advances the cursor
+    socketRef.current.on("notifications_batch", (batch) => {
+      batch.notifications.forEach(receive);
+    });
+
     socketRef.current.on("notification", (notification) => {
-      // Prevent duplicate notifications
-      if (receivedNotificationIds.current.has(notification.id)) {
-        console.log("Duplicate notification ignored:", notification.id);
+      if (!receive(notification)) {
         return;
       }
 
       console.log("New notification:", notification);
-      receivedNotificationIds.current.add(notification.id);
-      
-      // Add to notifications list
-      setNotifications((prev) => [notification, ...prev]);
-      
+
       // Show iPhone-style banner
       setBannerNotification(notification);
-      
-      // Trigger parent callback if provided
-      if (onNewNotification) {
-        onNewNotification(notification);
-      }
-      
+
       // Show browser notification if permission granted
       if (Notification.permission === "granted") {
         new Notification("VoltGuard Alert", {
@@ -28,7 +28,8 @@ export function CameraSystemModal({ onClose }) {
     socketRef.current.on("connect", () => {
       console.log("Connected to server")
       setIsConnected(true)
-      requestFrame()
+      // Server-push mode: frames arrive as raw JPEG bytes at the negotiated rate
+      socketRef.current.emit("subscribe_frames", { fps: 10, profile: "dashboard", binary: true })
     })
 
     socketRef.current.on("disconnect", () => {
@@ -36,32 +37,32 @@ export function CameraSystemModal({ onClose }) {
       setIsConnected(false)
     })
 
-    socketRef.current.on("frame", (data) => {
+    socketRef.current.on("frame_binary", (data) => {
       if (imgRef.current) {
-        imgRef.current.src = `data:image/jpeg;base64,${data.image}`
+        const url = URL.createObjectURL(new Blob([data.image], { type: "image/jpeg" }))
+        const previous = imgRef.current.src
+        imgRef.current.src = url
+        if (previous.startsWith("blob:")) {
+          URL.revokeObjectURL(previous)
+        }
         setHasFrame(true)
       }
-      requestFrame()
     })
 
     socketRef.current.on("error", (error) => {
       console.error("Frame error:", error)
-      setTimeout(requestFrame, 1000)
     })
 
     return () => {
       if (socketRef.current) {
         socketRef.current.disconnect()
       }
+      if (imgRef.current && imgRef.current.src.startsWith("blob:")) {
+        URL.revokeObjectURL(imgRef.current.src)
+      }
     }
   }, [])
 
-  const requestFrame = () => {
-    if (socketRef.current && socketRef.current.connected) {
-      socketRef.current.emit("get_frame", {})
-    }
-  }
-
   const topAppliance = {
     name: "Air Conditioner",
     hoursOn: 8.5,
@@ -15,7 +15,12 @@ export default function VideoFeed() {
     socketRef.current.on("connect", () => {
       console.log("Connected to server");
       setIsConnected(true);
-      requestFrame();
+      // Server-push mode: frames arrive as raw JPEG bytes at the negotiated rate
+      socketRef.current.emit(
+        "subscribe_frames",
+        { fps: 15, profile: "full", binary: true },
+        (settings) => console.log("Streaming frames:", settings)
+      );
     });
 
     socketRef.current.on("disconnect", () => {
@@ -23,32 +28,31 @@ export default function VideoFeed() {
       setIsConnected(false);
     });
 
-    socketRef.current.on("frame", (data) => {
+    socketRef.current.on("frame_binary", (data) => {
       if (imgRef.current) {
-        imgRef.current.src = `data:image/jpeg;base64,${data.image}`;
+        const url = URL.createObjectURL(new Blob([data.image], { type: "image/jpeg" }));
+        const previous = imgRef.current.src;
+        imgRef.current.src = url;
+        if (previous.startsWith("blob:")) {
+          URL.revokeObjectURL(previous);
+        }
       }
-      // Request next frame
-      requestFrame();
     });
 
     socketRef.current.on("error", (error) => {
       console.error("Frame error:", error);
-      setTimeout(requestFrame, 1000);
     });
 
     return () => {
       if (socketRef.current) {
         socketRef.current.disconnect();
       }
+      if (imgRef.current && imgRef.current.src.startsWith("blob:")) {
+        URL.revokeObjectURL(imgRef.current.src);
+      }
     };
   }, []);
 
-  const requestFrame = () => {
-    if (socketRef.current && socketRef.current.connected) {
-      socketRef.current.emit("get_frame", {});
-    }
-  };
-
   return (
     <div style={{ padding: "20px", maxWidth: "1200px", margin: "0 auto" }}>
       <h1>VoltGuard Live Feed</h1>
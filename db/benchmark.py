@@ -0,0 +1,213 @@
+"""
+Latency benchmark for the MCP tool queries at increasing table sizes.
+
+Loads synthetic events into a dedicated benchmark database in steps
+(default 1e4, 1e5, 1e6, 1e7 events; each step only adds the difference),
+and after every step runs each tool query, read verbatim from
+backend/main.py like explain_check.py does, --repeat times. It reports:
+
+  - p50/p95 query latency (execute + fetch, as the tool does it)
+  - p50 JSON serialization time of the result
+  - rows scanned and buffers touched, from one EXPLAIN ANALYZE
+
+Results can be saved as a baseline and compared on later runs; the
+command exits 1 when a query's p95 regresses beyond --tolerance.
+
+    python db/benchmark.py --sizes 1e4,1e5,1e6 --save results.json
+    python db/benchmark.py --sizes 1e4,1e5,1e6 --baseline results.json
+
+The benchmark database (PG_BENCH_DATABASE, default voltguard_bench) is
+wiped at the start and gets db/schema.sql if it has no tables yet; it
+must not be the application database.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from explain_check import DB_CONFIG, EXPECTATIONS, SCAN_NODES, load_tool_queries
+import generator
+
+SCHEMA = Path(__file__).resolve().parent / "schema.sql"
+BENCH_DATABASE = os.getenv("PG_BENCH_DATABASE", "voltguard_bench")
+
+# Differences below this many milliseconds are noise, not regressions
+NOISE_FLOOR_MS = 1.0
+
+
+def json_serial(obj):
+    """Same fallback serializer the MCP tools use"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return str(obj)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def parse_sizes(text):
+    """'1e4,1e5,1e6' -> [10000, 100000, 1000000]"""
+    return sorted(int(float(s)) for s in text.split(",") if s.strip())
+
+
+def prepare_database(conn, locations, devices):
+    """Schema if missing, then empty tables and a fresh set of locations/devices"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('waste_events')")
+        if cur.fetchone()[0] is None:
+            print(f"⚙️ Creating schema from {SCHEMA.name}...")
+            cur.execute(SCHEMA.read_text(encoding="utf-8"))
+        cur.execute("""
+            TRUNCATE waste_events, waste_rollup_hourly, waste_rollup_daily,
+                     device_catalog, locations CASCADE
+        """)
+        location_ids = generator.generate_locations(cur, count=locations)
+        return generator.generate_devices(cur, location_ids, count=devices)
+
+
+def plan_stats(plan):
+    """Rows read by every scan node (returned + filtered out), and buffers"""
+    rows = 0
+    if plan.get("Node Type") in SCAN_NODES:
+        loops = plan.get("Actual Loops", 1)
+        rows += (plan.get("Actual Rows", 0) + plan.get("Rows Removed by Filter", 0)
+                 + plan.get("Rows Removed by Index Recheck", 0)) * loops
+    for child in plan.get("Plans", []):
+        rows += plan_stats(child)[0]
+    buffers = plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0)
+    return rows, buffers
+
+
+def bench_query(conn, sql, params, repeat):
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        # Warm-up: plan caches and shared buffers, not measured
+        cur.execute(sql, params)
+        cur.fetchall()
+
+        query_ms, serialize_ms = [], []
+        result_rows = 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cur.execute(sql, params)
+            results = cur.fetchall()
+            fetched = time.perf_counter()
+            json.dumps([dict(r) for r in results], default=json_serial)
+            query_ms.append((fetched - started) * 1000)
+            serialize_ms.append((time.perf_counter() - fetched) * 1000)
+            result_rows = len(results)
+
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0][0]["Plan"]
+    rows_scanned, buffers = plan_stats(plan)
+
+    return {
+        "p50_ms": round(percentile(query_ms, 50), 3),
+        "p95_ms": round(percentile(query_ms, 95), 3),
+        "serialize_p50_ms": round(percentile(serialize_ms, 50), 3),
+        "result_rows": result_rows,
+        "rows_scanned": rows_scanned,
+        "buffers": buffers,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Queries whose p95 got slower than baseline * (1 + tolerance)"""
+    regressions = []
+    for size, tools in results.items():
+        for name, current in tools.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            limit = before["p95_ms"] * (1 + tolerance)
+            if current["p95_ms"] > limit and current["p95_ms"] - before["p95_ms"] > NOISE_FLOOR_MS:
+                regressions.append((size, name, before["p95_ms"], current["p95_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MCP tool queries over growing datasets")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1e4,1e5,1e6,1e7"),
+                        help="Comma-separated event counts, e.g. 1e4,1e5,1e6")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query and size")
+    parser.add_argument("--days", type=int, default=365, help="Spread events over this many days")
+    parser.add_argument("--locations", type=int, default=6)
+    parser.add_argument("--devices", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database", default=BENCH_DATABASE,
+                        help="Benchmark database, wiped on start (default: $PG_BENCH_DATABASE)")
+    parser.add_argument("--save", help="Write results as JSON (usable as a baseline)")
+    parser.add_argument("--baseline", help="Compare with a saved results file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed p95 slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if args.database == DB_CONFIG["dbname"]:
+        parser.error(f"refusing to wipe the application database '{args.database}'")
+
+    queries = load_tool_queries()
+    # Same locations/devices (names and ids) on every run
+    random.seed(args.seed)
+    generator.Faker.seed(args.seed)
+
+    conn = psycopg2.connect(**{**DB_CONFIG, "dbname": args.database})
+    conn.autocommit = True
+    results = {}
+    try:
+        device_list = prepare_database(conn, args.locations, args.devices)
+        # Up to now, not the end of today: the tool queries exclude the future
+        end = datetime.now(timezone.utc)
+        loaded = 0
+        for step, size in enumerate(args.sizes):
+            if size > loaded:
+                generator.bulk_load_waste_events(conn, device_list, size - loaded, end,
+                                                 args.days, args.seed + step)
+                with conn.cursor() as cur:
+                    # Visibility map for index-only scans
+                    cur.execute("VACUUM (ANALYZE) waste_events")
+                loaded = size
+
+            print(f"\n📊 {size:,} events")
+            print(f"   {'tool':<32}{'p50 ms':>10}{'p95 ms':>10}{'json ms':>10}{'scanned':>12}{'buffers':>10}")
+            results[str(size)] = {}
+            for name, spec in EXPECTATIONS.items():
+                stats = bench_query(conn, queries[name], spec["params"], args.repeat)
+                results[str(size)][name] = stats
+                print(f"   {name:<32}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                      f"{stats['serialize_p50_ms']:>10.2f}{stats['rows_scanned']:>12,}{stats['buffers']:>10,}")
+    finally:
+        conn.close()
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n💾 Results saved to {args.save}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for size, name, before, after in regressions:
+            print(f"❌ {name} @ {int(size):,}: p95 {before:.2f} ms -> {after:.2f} ms")
+        if regressions:
+            return 1
+        print(f"✅ No p95 regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+EXPLAIN-based index regression check for the MCP tool queries.
+
+Inside one transaction that is rolled back at the end, this generates a
+synthetic dataset (locations, devices and --rows waste events, which also
+fills the rollups through the trigger), ANALYZEs it and EXPLAINs every
+tool query taken verbatim from backend/main.py. It fails if a query
+sequentially scans a table it should reach through an index, if a
+rollup-backed tool touches the raw waste_events table, or if a
+time-bounded query on waste_events reads more monthly partitions than its
+window can span (partition pruning lost).
+
+Sequential scans are disabled while planning, so the check asks "can an
+index serve this predicate?" (sargable filter + matching index), which
+does not depend on how big the generated dataset is.
+
+    python db/explain_check.py            # exit code 1 on any failure
+    python db/explain_check.py --rows 200000 --verbose
+"""
+import argparse
+import ast
+import os
+import re
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import dotenv
+import psycopg2
+
+dotenv.load_dotenv()
+
+DB_CONFIG = {
+    "dbname": os.getenv("PG_DATABASE", "mydatabase"),
+    "user": os.getenv("PG_USER", "postgres"),
+    "password": os.getenv("PG_PASSWORD", "lou"),
+    "host": os.getenv("PG_HOST", "localhost"),
+    "port": os.getenv("PG_PORT", "5432")
+}
+
+TOOLS_MODULE = Path(__file__).resolve().parent.parent / "backend" / "main.py"
+
+RAW = "waste_events"
+# Monthly and default partitions of waste_events appear under their own names
+PARTITION = re.compile(r"^waste_events_(p\d{4}_\d{2}|default)$")
+SCAN_NODES = ("Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan")
+
+today = date.today()
+
+# tool -> parameters, tables that must be reached through an index, and
+# whether the raw event table may be read at all; max_partitions bounds
+# how many waste_events partitions a time-bounded query may touch
+EXPECTATIONS = {
+    "get_waste_summary_by_location": {
+        "params": ((today - timedelta(days=30)).isoformat(), today.isoformat()),
+        "indexed": ["waste_rollup_daily"],
+        "raw_allowed": False,
+    },
+    "get_top_offending_devices": {"params": (5,), "indexed": [], "raw_allowed": False},
+    "get_waste_heatmap_by_hour": {"params": None, "indexed": [], "raw_allowed": False},
+    "get_confidence_check": {
+        "params": (0.8, 30, 30),
+        "indexed": [RAW],
+        "raw_allowed": True,
+        "max_partitions": 2,
+    },
+    "get_devices_by_location": {"params": ("%Room%",), "indexed": [], "raw_allowed": False},
+    "get_weekly_trend_comparison": {
+        "params": None,
+        "indexed": ["waste_rollup_hourly"],
+        "raw_allowed": False,
+    },
+    "get_recent_logs": {"params": (5,), "indexed": [RAW], "raw_allowed": True},
+}
+
+# Access paths the schema promises beyond the tool queries
+EXTRA_QUERIES = {
+    "device time window (covering index)": {
+        "sql": """
+            SELECT SUM(estimated_cost_php), SUM(kwh_consumed)
+            FROM waste_events
+            WHERE device_id = (SELECT device_id FROM device_catalog LIMIT 1)
+              AND detection_timestamp >= NOW() - INTERVAL '7 days'
+              AND detection_timestamp < NOW()
+        """,
+        "params": None,
+        "indexed": [RAW],
+        "raw_allowed": True,
+        "max_partitions": 2,
+    },
+    "time range (rollup refresh)": {
+        "sql": """
+            SELECT device_id, COUNT(*)
+            FROM waste_events
+            WHERE detection_timestamp >= NOW() - INTERVAL '1 day'
+              AND detection_timestamp < NOW()
+            GROUP BY device_id
+        """,
+        "params": None,
+        "indexed": [RAW],
+        "raw_allowed": True,
+        "max_partitions": 2,
+    },
+}
+
+
+def load_tool_queries(path=TOOLS_MODULE):
+    """The `query = \"\"\"...\"\"\"` literal of every @mcp.tool() in the server"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    queries = {}
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if not any(ast.unparse(d).startswith("mcp.tool") for d in node.decorator_list):
+            continue
+        for stmt in ast.walk(node):
+            if (isinstance(stmt, ast.Assign)
+                    and any(isinstance(t, ast.Name) and t.id == "query" for t in stmt.targets)
+                    and isinstance(stmt.value, ast.Constant)):
+                queries[node.name] = stmt.value.value
+    return queries
+
+
+def generate_dataset(cur, rows):
+    """Synthetic locations, devices and events spread over the last year"""
+    cur.execute("SELECT ensure_waste_event_partitions(NOW() - INTERVAL '13 months')")
+    cur.execute("""
+        INSERT INTO locations (name, description)
+        SELECT 'Explain Room ' || g, 'explain_check'
+        FROM generate_series(1, 5) g
+    """)
+    cur.execute("""
+        INSERT INTO device_catalog (location_id, device_name, avg_wattage_rating)
+        SELECT l.location_id, 'explain device ' || g, 50 + g * 100
+        FROM locations l, generate_series(1, 6) g
+        WHERE l.description = 'explain_check'
+    """)
+    cur.execute("""
+        WITH devices AS (
+            SELECT array_agg(device_id) AS ids FROM device_catalog
+            WHERE device_name LIKE 'explain device %%'
+        )
+        INSERT INTO waste_events
+            (device_id, detection_timestamp, duration_raw, duration_interval,
+             kwh_consumed, estimated_cost_php, confidence_score)
+        SELECT
+            ids[1 + (g %% array_length(ids, 1))],
+            NOW() - random() * INTERVAL '365 days',
+            NULL,
+            (10 + (g %% 710)) * INTERVAL '1 minute',
+            round((random() * 5)::numeric, 4),
+            round((random() * 60)::numeric, 2),
+            round((0.5 + random() * 0.5)::numeric, 4)
+        FROM devices, generate_series(1, %s) g
+    """, (rows,))
+    cur.execute("ANALYZE locations, device_catalog, waste_events, "
+                "waste_rollup_hourly, waste_rollup_daily")
+
+
+def scans(plan):
+    """(node type, relation, index, partition) for every table access in a plan tree"""
+    found = []
+    if plan.get("Node Type") in SCAN_NODES and "Relation Name" in plan:
+        index = plan.get("Index Name")
+        if plan["Node Type"] == "Bitmap Heap Scan":
+            index = ",".join(p.get("Index Name", "") for p in plan.get("Plans", []))
+        relation = plan["Relation Name"]
+        partition = relation if PARTITION.match(relation) else None
+        found.append((plan["Node Type"], RAW if partition else relation, index, partition))
+    for child in plan.get("Plans", []):
+        found.extend(scans(child))
+    return found
+
+
+def check(cur, name, sql, spec, verbose):
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, spec["params"])
+    plan = cur.fetchone()[0][0]["Plan"]
+    accesses = scans(plan)
+    problems = []
+
+    for table in spec["indexed"]:
+        table_scans = [s for s in accesses if s[1] == table]
+        if not table_scans:
+            problems.append(f"expected an index scan on {table}, table not accessed")
+        for node, _, index, partition in table_scans:
+            if node == "Seq Scan":
+                problems.append(f"sequential scan on {partition or table}")
+    if not spec["raw_allowed"] and any(s[1] == RAW for s in accesses):
+        problems.append(f"reads raw {RAW} instead of the rollups")
+    if "max_partitions" in spec:
+        partitions = {s[3] for s in accesses if s[3]}
+        if len(partitions) > spec["max_partitions"]:
+            problems.append(f"reads {len(partitions)} {RAW} partitions "
+                            f"(at most {spec['max_partitions']}), pruning lost")
+
+    status = "FAIL" if problems else "ok"
+    print(f"[{status}] {name}")
+    if verbose or problems:
+        for node, relation, index, partition in accesses:
+            print(f"        {node} on {partition or relation}" + (f" using {index}" if index else ""))
+    for problem in problems:
+        print(f"        -> {problem}")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert index usage of the MCP tool queries")
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic waste events to generate")
+    parser.add_argument("--verbose", action="store_true", help="Print every table access")
+    args = parser.parse_args()
+
+    queries = load_tool_queries()
+    missing = set(EXPECTATIONS) - set(queries)
+    if missing:
+        print(f"❌ Tool queries not found in {TOOLS_MODULE.name}: {sorted(missing)}")
+        return 1
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    ok = True
+    try:
+        with conn.cursor() as cur:
+            print(f"⚙️ Generating {args.rows} synthetic events (rolled back afterwards)...")
+            generate_dataset(cur, args.rows)
+            cur.execute("SET LOCAL enable_seqscan = off")
+
+            for name, spec in EXPECTATIONS.items():
+                ok &= check(cur, name, queries[name], spec, args.verbose)
+            for name, spec in EXTRA_QUERIES.items():
+                ok &= check(cur, name, spec["sql"], spec, args.verbose)
+    finally:
+        conn.rollback()
+        conn.close()
+
+    print("✅ All queries use their indexes" if ok else "❌ Index regression detected")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
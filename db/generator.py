@@ -1,7 +1,22 @@
+"""
+Synthetic data for VoltGuard.
+
+    python db/generator.py                         # small demo dataset (row by row)
+    python db/generator.py --bulk --events 10000000 --days 365 --seed 42
+
+--bulk generates events with NumPy in chunks and loads them with
+COPY FROM STDIN. Timestamps follow a household pattern (morning and
+evening peaks in local time, more waste on weekends), durations are
+log-normal, and the same --seed and a past --end-date always produce the
+same dataset, so benchmark runs are comparable (a range ending today
+stops at the current time).
+"""
+import argparse
+import io
 import psycopg2
 import random
 from faker import Faker
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 import uuid
 import os
 import dotenv
@@ -32,9 +47,25 @@ DEVICE_TYPES = {
     "Heater": {"watts": 2000, "standby": 0, "max_idle": 10},
 }
 
+# Relative likelihood of a waste event starting in each local hour: people
+# leave things on when heading out in the morning and through the evening
+DIURNAL_WEIGHTS = [
+    0.3, 0.2, 0.2, 0.2, 0.2, 0.4, 1.0, 2.2, 2.6, 1.6, 0.9, 0.8,
+    1.0, 0.9, 0.8, 0.9, 1.2, 1.8, 2.4, 2.8, 2.9, 2.5, 1.6, 0.8,
+]
+# Monday..Sunday
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 1.1, 1.35, 1.3]
+
+# Rows per COPY statement in --bulk mode (bounds memory, one transaction each)
+BULK_CHUNK_SIZE = 500_000
+
 def get_db_connection():
     return psycopg2.connect(**DB_CONFIG)
 
+def new_uuid():
+    """uuid4 drawn from `random`, so seeded runs reproduce the same ids"""
+    return str(uuid.UUID(int=random.getrandbits(128), version=4))
+
 def generate_locations(curr, count=5):
     print(f"📍 Generating {count} locations...")
     location_ids = []
@@ -42,7 +73,7 @@ def generate_locations(curr, count=5):
     
     for _ in range(count):
         loc_name = locations.pop(0) if locations else fake.word().capitalize() + " Room"
-        loc_id = str(uuid.uuid4())
+        loc_id = new_uuid()
         
         curr.execute("""
             INSERT INTO locations (location_id, name, description)
@@ -60,7 +91,7 @@ def generate_devices(curr, location_ids, count=10):
         dev_type = random.choice(list(DEVICE_TYPES.keys()))
         specs = DEVICE_TYPES[dev_type]
         loc_id = random.choice(location_ids)
-        dev_id = str(uuid.uuid4())
+        dev_id = new_uuid()
         
         # Ensure unique names per room (e.g., "Living Room Lamp")
         dev_name = f"{dev_type} {random.randint(1, 99)}"
@@ -122,15 +153,124 @@ def generate_waste_events(curr, device_list, count=100):
             round(random.uniform(0.85, 0.99), 4)
         ))
 
+def _first_day(end, days):
+    """Local midnight starting the range: `days` calendar days, the last one being the day `end` falls on"""
+    last_day = (end - timedelta(microseconds=1)).date()
+    return datetime.combine(last_day - timedelta(days=days - 1), datetime.min.time())
+
+def _event_chunk(rng, device_list, propensity, count, end, days, utc_offset):
+    """CSV text for `count` events, generated column-wise with NumPy"""
+    import numpy as np
+
+    device_ids = np.array([d for d, _ in device_list])
+    watts = np.array([w for _, w in device_list], dtype=np.float64)
+    devices = rng.choice(len(device_list), size=count, p=propensity / propensity.sum())
+
+    # Day (weighted by weekday), local hour (diurnal), second within the hour
+    first_day = _first_day(end, days)
+    day_weights = np.array([WEEKDAY_WEIGHTS[(first_day + timedelta(days=d)).weekday()]
+                            for d in range(days)])
+    day = rng.choice(days, size=count, p=day_weights / day_weights.sum())
+    hour = rng.choice(24, size=count, p=np.array(DIURNAL_WEIGHTS) / sum(DIURNAL_WEIGHTS))
+    second = rng.integers(0, 3600, size=count)
+    start = np.datetime64(first_day, "s") - np.timedelta64(utc_offset, "h")
+    timestamps = start + (day * 86400 + hour * 3600 + second).astype("timedelta64[s]")
+    # Nothing after `end` (e.g. later today): move those to the day before
+    limit = np.datetime64(end.astimezone(timezone.utc).replace(tzinfo=None), "s")
+    timestamps = np.where(timestamps > limit, timestamps - np.timedelta64(1, "D"), timestamps)
+    timestamps = np.minimum(timestamps, limit)
+
+    # Mostly around an hour, occasionally a whole day's worth
+    minutes = np.clip(rng.lognormal(np.log(60), 0.9, size=count), 10, 720).astype(np.int64)
+    kwh = watts[devices] * (minutes / 60.0) / 1000.0
+    cost = kwh * ELECTRICITY_RATE_PHP
+    confidence = 0.85 + rng.beta(5, 2, size=count) * 0.14
+
+    duration_raw = np.char.add(np.char.add(np.char.zfill((minutes // 60).astype(str), 2), ":"),
+                               np.char.zfill((minutes % 60).astype(str), 2))
+    columns = [
+        device_ids[devices],
+        np.char.add(np.datetime_as_string(timestamps, unit="s"), "+00"),
+        duration_raw,
+        np.char.add(minutes.astype(str), " minutes"),
+        np.round(kwh, 4).astype(str),
+        np.round(cost, 2).astype(str),
+        np.round(confidence, 4).astype(str),
+    ]
+    return "\n".join(map(",".join, zip(*columns))) + "\n"
+
+def bulk_load_waste_events(conn, device_list, count, end, days, seed, utc_offset=8):
+    """COPY `count` synthetic events in BULK_CHUNK_SIZE chunks (autocommit: one transaction each)"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    # Some devices are left on far more often than others; drawn once so
+    # every chunk follows the same distribution
+    propensity = rng.gamma(2.0, size=len(device_list))
+    # First event time in UTC: local midnight of the first day, shifted by utc_offset
+    start = (_first_day(end, days) - timedelta(hours=utc_offset)).replace(tzinfo=timezone.utc)
+    with conn.cursor() as curr:
+        # Monthly partitions for the whole range, so nothing lands in the default one
+        curr.execute("SELECT ensure_waste_event_partitions(%s)", (start,))
+
+    print(f"⚠️ Bulk loading {count:,} waste events over {days} days (seed {seed}), "
+          f"{start:%Y-%m-%d %H:%M} to {end:%Y-%m-%d %H:%M} UTC...")
+    loaded = 0
+    while loaded < count:
+        size = min(BULK_CHUNK_SIZE, count - loaded)
+        buffer = io.StringIO(_event_chunk(rng, device_list, propensity, size, end, days, utc_offset))
+        with conn.cursor() as curr:
+            curr.copy_expert("""
+                COPY waste_events
+                    (device_id, detection_timestamp, duration_raw, duration_interval,
+                     kwh_consumed, estimated_cost_php, confidence_score)
+                FROM STDIN WITH (FORMAT csv)
+            """, buffer)
+        loaded += size
+        print(f"   {loaded:,} / {count:,}")
+
+    with conn.cursor() as curr:
+        curr.execute("ANALYZE waste_events")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic VoltGuard data")
+    parser.add_argument("--locations", type=int, default=4, help="Locations to create")
+    parser.add_argument("--devices", type=int, default=12, help="Devices to create (duplicate names are skipped)")
+    parser.add_argument("--events", type=int, default=150, help="Waste events to create")
+    parser.add_argument("--days", type=int, default=30, help="Spread events over this many days (--bulk)")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None,
+                        help="Last day of the generated range, YYYY-MM-DD (--bulk, default: today)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible datasets")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Vectorized generation + COPY, for millions of events")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+        Faker.seed(args.seed)
+
     conn = get_db_connection()
     conn.autocommit = True
     curr = conn.cursor()
     
     try:
-        loc_ids = generate_locations(curr, count=4)
-        dev_list = generate_devices(curr, loc_ids, count=12)
-        generate_waste_events(curr, dev_list, count=150)
+        loc_ids = generate_locations(curr, count=args.locations)
+        dev_list = generate_devices(curr, loc_ids, count=args.devices)
+        if args.bulk:
+            now = datetime.now(timezone.utc)
+            end_day = args.end_date or now.date()
+            # End of end_day; a range ending today stops at now, so only past
+            # end dates give the same rows for the same --seed
+            end = datetime.combine(end_day + timedelta(days=1), datetime.min.time(), timezone.utc)
+            if end_day >= now.date():
+                end = now
+                print("⚠️ Range ends now: pass a past --end-date for a reproducible dataset")
+            bulk_load_waste_events(conn, dev_list, args.events, end, args.days,
+                                   args.seed if args.seed is not None else random.randrange(2**32))
+        else:
+            generate_waste_events(curr, dev_list, count=args.events)
         print("✅ Synthetic Data Generation Complete!")
         
     except Exception as e:
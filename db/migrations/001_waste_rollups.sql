@@ -0,0 +1,185 @@
+-- 001: Incrementally maintained rollups for waste_events
+-- Adds waste_rollup_hourly / waste_rollup_daily, the trigger that keeps
+-- them current, refresh_waste_rollups(), points daily_waste_analytics at
+-- the daily rollup and backfills from the existing events.
+--
+--   psql -d mydatabase -f db/migrations/001_waste_rollups.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS waste_rollup_hourly (
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    device_id UUID NOT NULL REFERENCES device_catalog(device_id),
+    event_count BIGINT NOT NULL,
+    total_hours NUMERIC(14, 2) NOT NULL,
+    total_kwh NUMERIC(16, 4) NOT NULL,
+    total_cost_php NUMERIC(14, 2) NOT NULL,
+    min_confidence NUMERIC(5, 4),
+    PRIMARY KEY (bucket_start, device_id)
+);
+
+CREATE TABLE IF NOT EXISTS waste_rollup_daily (
+    bucket_date DATE NOT NULL, -- calendar date in waste_rollup_time_zone()
+    device_id UUID NOT NULL REFERENCES device_catalog(device_id),
+    event_count BIGINT NOT NULL,
+    total_hours NUMERIC(14, 2) NOT NULL,
+    total_kwh NUMERIC(16, 4) NOT NULL,
+    total_cost_php NUMERIC(14, 2) NOT NULL,
+    min_confidence NUMERIC(5, 4),
+    PRIMARY KEY (bucket_date, device_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollup_hourly_device ON waste_rollup_hourly(device_id);
+CREATE INDEX IF NOT EXISTS idx_rollup_daily_device ON waste_rollup_daily(device_id);
+
+-- Time zone whose calendar days and hours the rollups bucket on, so "a
+-- day" of waste matches the deployment's local day. To change it, redefine
+-- this function and rebuild with SELECT refresh_waste_rollups();
+CREATE OR REPLACE FUNCTION waste_rollup_time_zone() RETURNS TEXT AS $$
+    SELECT 'Asia/Manila'::text
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Adds the rows of one INSERT statement to both rollups
+CREATE OR REPLACE FUNCTION rollup_waste_events() RETURNS TRIGGER AS $$
+DECLARE
+    tz TEXT := waste_rollup_time_zone();
+BEGIN
+    -- Sorted so concurrent inserts lock rollup rows in the same order
+    INSERT INTO waste_rollup_hourly AS r
+        (bucket_start, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        date_trunc('hour', n.detection_timestamp AT TIME ZONE tz) AT TIME ZONE tz,
+        n.device_id,
+        COUNT(*),
+        COALESCE(SUM(n.duration_hours), 0),
+        SUM(n.kwh_consumed),
+        SUM(n.estimated_cost_php),
+        MIN(n.confidence_score)
+    FROM new_events n
+    WHERE n.device_id IS NOT NULL
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (bucket_start, device_id) DO UPDATE SET
+        event_count = r.event_count + EXCLUDED.event_count,
+        total_hours = r.total_hours + EXCLUDED.total_hours,
+        total_kwh = r.total_kwh + EXCLUDED.total_kwh,
+        total_cost_php = r.total_cost_php + EXCLUDED.total_cost_php,
+        min_confidence = LEAST(r.min_confidence, EXCLUDED.min_confidence);
+
+    INSERT INTO waste_rollup_daily AS r
+        (bucket_date, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        (n.detection_timestamp AT TIME ZONE tz)::date,
+        n.device_id,
+        COUNT(*),
+        COALESCE(SUM(n.duration_hours), 0),
+        SUM(n.kwh_consumed),
+        SUM(n.estimated_cost_php),
+        MIN(n.confidence_score)
+    FROM new_events n
+    WHERE n.device_id IS NOT NULL
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (bucket_date, device_id) DO UPDATE SET
+        event_count = r.event_count + EXCLUDED.event_count,
+        total_hours = r.total_hours + EXCLUDED.total_hours,
+        total_kwh = r.total_kwh + EXCLUDED.total_kwh,
+        total_cost_php = r.total_cost_php + EXCLUDED.total_cost_php,
+        min_confidence = LEAST(r.min_confidence, EXCLUDED.min_confidence);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_waste_events_rollup ON waste_events;
+CREATE TRIGGER trg_waste_events_rollup
+    AFTER INSERT ON waste_events
+    REFERENCING NEW TABLE AS new_events
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_waste_events();
+
+-- Rebuilds the rollups from waste_events for [range_start, range_end),
+-- widened to whole days in waste_rollup_time_zone(). The trigger only sees
+-- INSERTs: run this after UPDATEs/DELETEs of events, or with no arguments
+-- to rebuild everything.
+CREATE OR REPLACE FUNCTION refresh_waste_rollups(
+    range_start TIMESTAMP WITH TIME ZONE DEFAULT '-infinity',
+    range_end TIMESTAMP WITH TIME ZONE DEFAULT 'infinity'
+) RETURNS VOID AS $$
+DECLARE
+    tz TEXT := waste_rollup_time_zone();
+    day_start TIMESTAMP WITH TIME ZONE :=
+        date_trunc('day', range_start AT TIME ZONE tz) AT TIME ZONE tz;
+    day_end TIMESTAMP WITH TIME ZONE :=
+        (date_trunc('day', (range_end AT TIME ZONE tz) - INTERVAL '1 microsecond')
+         + INTERVAL '1 day') AT TIME ZONE tz;
+BEGIN
+    -- Concurrent inserts wait, then add their rows on top of the rebuilt totals
+    LOCK TABLE waste_rollup_hourly, waste_rollup_daily IN EXCLUSIVE MODE;
+
+    DELETE FROM waste_rollup_hourly
+    WHERE bucket_start >= day_start AND bucket_start < day_end;
+    DELETE FROM waste_rollup_daily
+    WHERE bucket_date >= (day_start AT TIME ZONE tz)::date
+      AND bucket_date < (day_end AT TIME ZONE tz)::date;
+
+    INSERT INTO waste_rollup_hourly
+        (bucket_start, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        date_trunc('hour', w.detection_timestamp AT TIME ZONE tz) AT TIME ZONE tz,
+        w.device_id,
+        COUNT(*),
+        COALESCE(SUM(w.duration_hours), 0),
+        SUM(w.kwh_consumed),
+        SUM(w.estimated_cost_php),
+        MIN(w.confidence_score)
+    FROM waste_events w
+    WHERE w.device_id IS NOT NULL
+      AND w.detection_timestamp >= day_start AND w.detection_timestamp < day_end
+    GROUP BY 1, 2;
+
+    INSERT INTO waste_rollup_daily
+        (bucket_date, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        (h.bucket_start AT TIME ZONE tz)::date,
+        h.device_id,
+        SUM(h.event_count),
+        SUM(h.total_hours),
+        SUM(h.total_kwh),
+        SUM(h.total_cost_php),
+        MIN(h.min_confidence)
+    FROM waste_rollup_hourly h
+    WHERE h.bucket_start >= day_start AND h.bucket_start < day_end
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The analytics view now reads the daily rollup
+CREATE OR REPLACE VIEW daily_waste_analytics AS
+SELECT 
+    d.device_name,
+    l.name as location,
+    r.bucket_date as event_date,
+    SUM(r.event_count)::bigint as total_incidents,
+    SUM(r.total_hours) as total_hours_wasted,
+    SUM(r.total_kwh) as total_kwh,
+    SUM(r.total_cost_php) as total_cost_php,
+    
+    -- Prescriptive Flag: Is this device behaving worse than allowed?
+    CASE 
+        WHEN SUM(r.total_hours) * 60 / NULLIF(SUM(r.event_count), 0) > d.max_allowed_idle_minutes 
+        THEN 'CRITICAL_VIOLATION'
+        ELSE 'WITHIN_LIMITS'
+    END as compliance_status
+FROM 
+    waste_rollup_daily r
+JOIN 
+    device_catalog d ON r.device_id = d.device_id
+JOIN 
+    locations l ON d.location_id = l.location_id
+GROUP BY 
+    d.device_name, l.name, r.bucket_date, d.max_allowed_idle_minutes;
+
+-- Backfill from the events already stored
+SELECT refresh_waste_rollups();
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- 002: Covering and confidence indexes for waste_events
+-- Built CONCURRENTLY so ingestion keeps running; psql runs each statement
+-- in its own transaction, which CONCURRENTLY requires (no BEGIN/COMMIT).
+--
+--   psql -d mydatabase -f db/migrations/002_waste_event_indexes.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_waste_device_time
+    ON waste_events(device_id, detection_timestamp)
+    INCLUDE (estimated_cost_php, kwh_consumed, duration_hours);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_waste_confidence
+    ON waste_events(confidence_score)
+    INCLUDE (device_id, detection_timestamp);
+
+-- Covered by the leading column of idx_waste_device_time
+DROP INDEX CONCURRENTLY IF EXISTS idx_device_lookup;
+
+ANALYZE waste_events;
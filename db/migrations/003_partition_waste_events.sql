@@ -0,0 +1,161 @@
+-- 003: Monthly range partitioning for waste_events
+-- Rebuilds waste_events as a table partitioned by detection_timestamp
+-- (one partition per UTC month plus a default), adds the partition
+-- maintenance functions and copies the existing events across. The rollups
+-- are left as they are: the copy happens before the rollup trigger is
+-- recreated, so nothing is counted twice.
+--
+-- Takes an exclusive lock on waste_events for the duration of the copy;
+-- stop ingestion first.
+--
+--   psql -d mydatabase -f db/migrations/003_partition_waste_events.sql
+
+BEGIN;
+
+ALTER TABLE waste_events RENAME TO waste_events_unpartitioned;
+ALTER TABLE waste_events_unpartitioned
+    RENAME CONSTRAINT waste_events_pkey TO waste_events_unpartitioned_pkey;
+
+CREATE TABLE waste_events (
+    event_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    device_id UUID REFERENCES device_catalog(device_id),
+    detection_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    duration_raw VARCHAR(20),
+    duration_interval INTERVAL NOT NULL,
+    duration_hours NUMERIC(10, 2) GENERATED ALWAYS AS (
+        EXTRACT(EPOCH FROM duration_interval) / 3600
+    ) STORED,
+    kwh_consumed NUMERIC(10, 4) NOT NULL,
+    estimated_cost_php NUMERIC(10, 2) NOT NULL,
+    confidence_score NUMERIC(5, 4),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (event_id, detection_timestamp)
+) PARTITION BY RANGE (detection_timestamp);
+
+CREATE TABLE waste_events_default PARTITION OF waste_events DEFAULT;
+
+CREATE OR REPLACE FUNCTION ensure_waste_event_partitions(
+    from_month TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    months_ahead INTEGER DEFAULT 3
+) RETURNS INTEGER AS $$
+DECLARE
+    month_start TIMESTAMP WITH TIME ZONE :=
+        date_trunc('month', from_month AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    last_start TIMESTAMP WITH TIME ZONE :=
+        (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead))
+        AT TIME ZONE 'UTC';
+    month_end TIMESTAMP WITH TIME ZONE;
+    part_name TEXT;
+    stranded BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= last_start LOOP
+        month_end := ((month_start AT TIME ZONE 'UTC') + INTERVAL '1 month') AT TIME ZONE 'UTC';
+        part_name := 'waste_events_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM');
+
+        IF to_regclass(part_name) IS NULL THEN
+            SELECT EXISTS (
+                SELECT 1 FROM waste_events_default
+                WHERE detection_timestamp >= month_start AND detection_timestamp < month_end
+            ) INTO stranded;
+
+            IF stranded THEN
+                -- The new partition's range must not overlap rows in the
+                -- default partition: move them across. Inserting into the
+                -- partition directly skips the rollup trigger (already counted).
+                CREATE TEMP TABLE stranded_events ON COMMIT DROP AS
+                SELECT * FROM waste_events_default
+                WHERE detection_timestamp >= month_start AND detection_timestamp < month_end;
+                DELETE FROM waste_events_default
+                WHERE detection_timestamp >= month_start AND detection_timestamp < month_end;
+            END IF;
+
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF waste_events FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, month_end
+            );
+
+            IF stranded THEN
+                EXECUTE format(
+                    'INSERT INTO %I (event_id, device_id, detection_timestamp, duration_raw,
+                                     duration_interval, kwh_consumed, estimated_cost_php,
+                                     confidence_score, created_at)
+                     SELECT event_id, device_id, detection_timestamp, duration_raw,
+                            duration_interval, kwh_consumed, estimated_cost_php,
+                            confidence_score, created_at
+                     FROM stranded_events',
+                    part_name
+                );
+                DROP TABLE stranded_events;
+            END IF;
+            created := created + 1;
+        END IF;
+
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Retention: removes monthly partitions that ended more than retain_months
+-- months before the current month. With archive => TRUE they are detached
+-- into the waste_archive schema instead of dropped. Returns their names.
+CREATE OR REPLACE FUNCTION drop_waste_event_partitions(
+    retain_months INTEGER,
+    archive BOOLEAN DEFAULT FALSE
+) RETURNS SETOF TEXT AS $$
+DECLARE
+    cutoff TIMESTAMP :=
+        date_trunc('month', NOW() AT TIME ZONE 'UTC') - make_interval(months => retain_months);
+    part_name TEXT;
+BEGIN
+    FOR part_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'waste_events'::regclass
+          AND c.relname ~ '^waste_events_p[0-9]{4}_[0-9]{2}$'
+          AND to_date(substring(c.relname FROM 15), 'YYYY_MM') + INTERVAL '1 month' <= cutoff
+        ORDER BY c.relname
+    LOOP
+        IF archive THEN
+            CREATE SCHEMA IF NOT EXISTS waste_archive;
+            EXECUTE format('ALTER TABLE waste_events DETACH PARTITION %I', part_name);
+            EXECUTE format('ALTER TABLE %I SET SCHEMA waste_archive', part_name);
+        ELSE
+            EXECUTE format('DROP TABLE %I', part_name);
+        END IF;
+        RETURN NEXT part_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Partitions for every month that has events, up to three months ahead
+SELECT ensure_waste_event_partitions(
+    COALESCE((SELECT MIN(detection_timestamp) FROM waste_events_unpartitioned), NOW())
+);
+
+INSERT INTO waste_events
+    (event_id, device_id, detection_timestamp, duration_raw, duration_interval,
+     kwh_consumed, estimated_cost_php, confidence_score, created_at)
+SELECT event_id, device_id, detection_timestamp, duration_raw, duration_interval,
+       kwh_consumed, estimated_cost_php, confidence_score, created_at
+FROM waste_events_unpartitioned;
+
+-- Also drops the old table's indexes and rollup trigger
+DROP TABLE waste_events_unpartitioned;
+
+CREATE INDEX idx_waste_timestamp ON waste_events(detection_timestamp);
+CREATE INDEX idx_waste_device_time ON waste_events(device_id, detection_timestamp)
+    INCLUDE (estimated_cost_php, kwh_consumed, duration_hours);
+CREATE INDEX idx_waste_confidence ON waste_events(confidence_score)
+    INCLUDE (device_id, detection_timestamp);
+
+CREATE TRIGGER trg_waste_events_rollup
+    AFTER INSERT ON waste_events
+    REFERENCING NEW TABLE AS new_events
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_waste_events();
+
+COMMIT;
+
+ANALYZE waste_events;
@@ -0,0 +1,65 @@
+"""
+Partition maintenance for waste_events, meant to run daily (cron/systemd).
+
+Creates the monthly partitions for the coming months (moving any events
+that landed in the default partition into them) and applies the retention
+policy: partitions older than --retain-months are dropped, or with
+--archive detached into the waste_archive schema. The hourly/daily rollups
+are kept either way, so the analytics keep their full history.
+
+    python db/partitions.py                       # create ahead, apply retention
+    python db/partitions.py --retain-months 0     # never drop anything
+    python db/partitions.py --archive
+"""
+import argparse
+import os
+import sys
+
+import dotenv
+import psycopg2
+
+dotenv.load_dotenv()
+
+DB_CONFIG = {
+    "dbname": os.getenv("PG_DATABASE", "mydatabase"),
+    "user": os.getenv("PG_USER", "postgres"),
+    "password": os.getenv("PG_PASSWORD", "lou"),
+    "host": os.getenv("PG_HOST", "localhost"),
+    "port": os.getenv("PG_PORT", "5432")
+}
+
+# Months of raw events kept; 0 keeps everything
+WASTE_EVENT_RETENTION_MONTHS = int(os.getenv("WASTE_EVENT_RETENTION_MONTHS", 24))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming waste_events partitions and apply retention")
+    parser.add_argument("--ahead", type=int, default=3, help="Months to create ahead of the current one")
+    parser.add_argument("--retain-months", type=int, default=WASTE_EVENT_RETENTION_MONTHS,
+                        help="Drop partitions older than this many months (0 = keep all)")
+    parser.add_argument("--archive", action="store_true",
+                        help="Detach old partitions into the waste_archive schema instead of dropping them")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute("SELECT ensure_waste_event_partitions(NOW(), %s)", (args.ahead,))
+            print(f"📅 Created {cur.fetchone()[0]} partition(s)")
+
+            if args.retain_months > 0:
+                cur.execute("SELECT drop_waste_event_partitions(%s, %s)",
+                            (args.retain_months, args.archive))
+                removed = [row[0] for row in cur.fetchall()]
+                action = "Archived" if args.archive else "Dropped"
+                print(f"🗑️ {action} {len(removed)} partition(s)" + (f": {', '.join(removed)}" if removed else ""))
+    except psycopg2.Error as e:
+        print(f"❌ Error: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
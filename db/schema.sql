@@ -31,8 +31,10 @@ CREATE TABLE device_catalog (
 
 -- 3. WASTE EVENTS
 -- The raw transactional data coming from your CV JSON
+-- Partitioned by month on detection_timestamp (see section 7); the primary
+-- key has to include the partition key.
 CREATE TABLE waste_events (
-    event_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    event_id UUID NOT NULL DEFAULT uuid_generate_v4(),
     device_id UUID REFERENCES device_catalog(device_id),
     
     -- When did the CV detect this?
@@ -52,37 +54,308 @@ CREATE TABLE waste_events (
     -- CV Model Metadata
     confidence_score NUMERIC(5, 4), -- e.g., 0.98
     
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (event_id, detection_timestamp)
+) PARTITION BY RANGE (detection_timestamp);
+
+-- Catches events outside every monthly partition until maintenance creates it
+CREATE TABLE waste_events_default PARTITION OF waste_events DEFAULT;
 
 -- 4. INDEXING
 -- Crucial for Time Series forecasting performance later
+-- Filters on detection_timestamp must be half-open ranges
+-- (ts >= start AND ts < end); casting the column (ts::date) bypasses them.
 CREATE INDEX idx_waste_timestamp ON waste_events(detection_timestamp);
-CREATE INDEX idx_device_lookup ON waste_events(device_id);
+-- Per-device time windows answered from the index alone; also serves
+-- plain device_id lookups
+CREATE INDEX idx_waste_device_time ON waste_events(device_id, detection_timestamp)
+    INCLUDE (estimated_cost_php, kwh_consumed, duration_hours);
+-- Low-confidence audit: range scan already in confidence order, no sort
+CREATE INDEX idx_waste_confidence ON waste_events(confidence_score)
+    INCLUDE (device_id, detection_timestamp);
+
+-- 5. ROLLUPS (Incrementally maintained aggregates)
+-- Hourly and daily totals per device, updated by a statement-level trigger
+-- as events are inserted, so analytics read a few rows per device and
+-- bucket instead of re-aggregating every raw event.
+-- Buckets are UTC; hour boundaries also line up with any whole-hour local
+-- offset (e.g. Asia/Manila). Locations come from device_catalog at query time.
+CREATE TABLE waste_rollup_hourly (
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    device_id UUID NOT NULL REFERENCES device_catalog(device_id),
+    event_count BIGINT NOT NULL,
+    total_hours NUMERIC(14, 2) NOT NULL,
+    total_kwh NUMERIC(16, 4) NOT NULL,
+    total_cost_php NUMERIC(14, 2) NOT NULL,
+    min_confidence NUMERIC(5, 4),
+    PRIMARY KEY (bucket_start, device_id)
+);
+
+CREATE TABLE waste_rollup_daily (
+    bucket_date DATE NOT NULL, -- calendar date in waste_rollup_time_zone()
+    device_id UUID NOT NULL REFERENCES device_catalog(device_id),
+    event_count BIGINT NOT NULL,
+    total_hours NUMERIC(14, 2) NOT NULL,
+    total_kwh NUMERIC(16, 4) NOT NULL,
+    total_cost_php NUMERIC(14, 2) NOT NULL,
+    min_confidence NUMERIC(5, 4),
+    PRIMARY KEY (bucket_date, device_id)
+);
+
+CREATE INDEX idx_rollup_hourly_device ON waste_rollup_hourly(device_id);
+CREATE INDEX idx_rollup_daily_device ON waste_rollup_daily(device_id);
+
+-- Time zone whose calendar days and hours the rollups bucket on, so "a
+-- day" of waste matches the deployment's local day. To change it, redefine
+-- this function and rebuild with SELECT refresh_waste_rollups();
+CREATE OR REPLACE FUNCTION waste_rollup_time_zone() RETURNS TEXT AS $$
+    SELECT 'Asia/Manila'::text
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Adds the rows of one INSERT statement to both rollups
+CREATE OR REPLACE FUNCTION rollup_waste_events() RETURNS TRIGGER AS $$
+DECLARE
+    tz TEXT := waste_rollup_time_zone();
+BEGIN
+    -- Sorted so concurrent inserts lock rollup rows in the same order
+    INSERT INTO waste_rollup_hourly AS r
+        (bucket_start, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        date_trunc('hour', n.detection_timestamp AT TIME ZONE tz) AT TIME ZONE tz,
+        n.device_id,
+        COUNT(*),
+        COALESCE(SUM(n.duration_hours), 0),
+        SUM(n.kwh_consumed),
+        SUM(n.estimated_cost_php),
+        MIN(n.confidence_score)
+    FROM new_events n
+    WHERE n.device_id IS NOT NULL
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (bucket_start, device_id) DO UPDATE SET
+        event_count = r.event_count + EXCLUDED.event_count,
+        total_hours = r.total_hours + EXCLUDED.total_hours,
+        total_kwh = r.total_kwh + EXCLUDED.total_kwh,
+        total_cost_php = r.total_cost_php + EXCLUDED.total_cost_php,
+        min_confidence = LEAST(r.min_confidence, EXCLUDED.min_confidence);
+
+    INSERT INTO waste_rollup_daily AS r
+        (bucket_date, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        (n.detection_timestamp AT TIME ZONE tz)::date,
+        n.device_id,
+        COUNT(*),
+        COALESCE(SUM(n.duration_hours), 0),
+        SUM(n.kwh_consumed),
+        SUM(n.estimated_cost_php),
+        MIN(n.confidence_score)
+    FROM new_events n
+    WHERE n.device_id IS NOT NULL
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    ON CONFLICT (bucket_date, device_id) DO UPDATE SET
+        event_count = r.event_count + EXCLUDED.event_count,
+        total_hours = r.total_hours + EXCLUDED.total_hours,
+        total_kwh = r.total_kwh + EXCLUDED.total_kwh,
+        total_cost_php = r.total_cost_php + EXCLUDED.total_cost_php,
+        min_confidence = LEAST(r.min_confidence, EXCLUDED.min_confidence);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
--- 5. ANALYTICS VIEW (The "Descriptive" Layer)
+CREATE TRIGGER trg_waste_events_rollup
+    AFTER INSERT ON waste_events
+    REFERENCING NEW TABLE AS new_events
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_waste_events();
+
+-- Rebuilds the rollups from waste_events for [range_start, range_end),
+-- widened to whole days in waste_rollup_time_zone(). The trigger only sees
+-- INSERTs: run this after UPDATEs/DELETEs of events, or with no arguments
+-- to rebuild everything.
+-- Ranges whose partitions were dropped by retention would rebuild as empty:
+-- keep range_start inside the retained months.
+CREATE OR REPLACE FUNCTION refresh_waste_rollups(
+    range_start TIMESTAMP WITH TIME ZONE DEFAULT '-infinity',
+    range_end TIMESTAMP WITH TIME ZONE DEFAULT 'infinity'
+) RETURNS VOID AS $$
+DECLARE
+    tz TEXT := waste_rollup_time_zone();
+    day_start TIMESTAMP WITH TIME ZONE :=
+        date_trunc('day', range_start AT TIME ZONE tz) AT TIME ZONE tz;
+    day_end TIMESTAMP WITH TIME ZONE :=
+        (date_trunc('day', (range_end AT TIME ZONE tz) - INTERVAL '1 microsecond')
+         + INTERVAL '1 day') AT TIME ZONE tz;
+BEGIN
+    -- Concurrent inserts wait, then add their rows on top of the rebuilt totals
+    LOCK TABLE waste_rollup_hourly, waste_rollup_daily IN EXCLUSIVE MODE;
+
+    DELETE FROM waste_rollup_hourly
+    WHERE bucket_start >= day_start AND bucket_start < day_end;
+    DELETE FROM waste_rollup_daily
+    WHERE bucket_date >= (day_start AT TIME ZONE tz)::date
+      AND bucket_date < (day_end AT TIME ZONE tz)::date;
+
+    INSERT INTO waste_rollup_hourly
+        (bucket_start, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        date_trunc('hour', w.detection_timestamp AT TIME ZONE tz) AT TIME ZONE tz,
+        w.device_id,
+        COUNT(*),
+        COALESCE(SUM(w.duration_hours), 0),
+        SUM(w.kwh_consumed),
+        SUM(w.estimated_cost_php),
+        MIN(w.confidence_score)
+    FROM waste_events w
+    WHERE w.device_id IS NOT NULL
+      AND w.detection_timestamp >= day_start AND w.detection_timestamp < day_end
+    GROUP BY 1, 2;
+
+    INSERT INTO waste_rollup_daily
+        (bucket_date, device_id, event_count, total_hours, total_kwh, total_cost_php, min_confidence)
+    SELECT
+        (h.bucket_start AT TIME ZONE tz)::date,
+        h.device_id,
+        SUM(h.event_count),
+        SUM(h.total_hours),
+        SUM(h.total_kwh),
+        SUM(h.total_cost_php),
+        MIN(h.min_confidence)
+    FROM waste_rollup_hourly h
+    WHERE h.bucket_start >= day_start AND h.bucket_start < day_end
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 6. ANALYTICS VIEW (The "Descriptive" Layer)
 -- The LLM/MCP should query THIS view, not the raw tables, for summaries.
+-- Reads the daily rollup, so it costs one row per device per day.
 CREATE OR REPLACE VIEW daily_waste_analytics AS
 SELECT 
     d.device_name,
     l.name as location,
-    DATE(w.detection_timestamp) as event_date,
-    COUNT(w.event_id) as total_incidents,
-    SUM(w.duration_hours) as total_hours_wasted,
-    SUM(w.kwh_consumed) as total_kwh,
-    SUM(w.estimated_cost_php) as total_cost_php,
+    r.bucket_date as event_date,
+    SUM(r.event_count)::bigint as total_incidents,
+    SUM(r.total_hours) as total_hours_wasted,
+    SUM(r.total_kwh) as total_kwh,
+    SUM(r.total_cost_php) as total_cost_php,
     
     -- Prescriptive Flag: Is this device behaving worse than allowed?
     CASE 
-        WHEN AVG(EXTRACT(EPOCH FROM w.duration_interval)/60) > d.max_allowed_idle_minutes 
+        WHEN SUM(r.total_hours) * 60 / NULLIF(SUM(r.event_count), 0) > d.max_allowed_idle_minutes 
         THEN 'CRITICAL_VIOLATION'
         ELSE 'WITHIN_LIMITS'
     END as compliance_status
 FROM 
-    waste_events w
+    waste_rollup_daily r
 JOIN 
-    device_catalog d ON w.device_id = d.device_id
+    device_catalog d ON r.device_id = d.device_id
 JOIN 
     locations l ON d.location_id = l.location_id
 GROUP BY 
-    d.device_name, l.name, DATE(w.detection_timestamp), d.max_allowed_idle_minutes;
\ No newline at end of file
+    d.device_name, l.name, r.bucket_date, d.max_allowed_idle_minutes;
+
+-- 7. PARTITION MAINTENANCE
+-- One partition per UTC month, named waste_events_pYYYY_MM. Run
+-- ensure_waste_event_partitions() daily (db/partitions.py) so upcoming
+-- months exist before events arrive; rows that landed in the default
+-- partition meanwhile are moved into the new month. Rollups are unaffected
+-- by moving or dropping partitions, so aggregates outlive raw retention.
+CREATE OR REPLACE FUNCTION ensure_waste_event_partitions(
+    from_month TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    months_ahead INTEGER DEFAULT 3
+) RETURNS INTEGER AS $$
+DECLARE
+    month_start TIMESTAMP WITH TIME ZONE :=
+        date_trunc('month', from_month AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    last_start TIMESTAMP WITH TIME ZONE :=
+        (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead))
+        AT TIME ZONE 'UTC';
+    month_end TIMESTAMP WITH TIME ZONE;
+    part_name TEXT;
+    stranded BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= last_start LOOP
+        month_end := ((month_start AT TIME ZONE 'UTC') + INTERVAL '1 month') AT TIME ZONE 'UTC';
+        part_name := 'waste_events_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYY_MM');
+
+        IF to_regclass(part_name) IS NULL THEN
+            SELECT EXISTS (
+                SELECT 1 FROM waste_events_default
+                WHERE detection_timestamp >= month_start AND detection_timestamp < month_end
+            ) INTO stranded;
+
+            IF stranded THEN
+                -- The new partition's range must not overlap rows in the
+                -- default partition: move them across. Inserting into the
+                -- partition directly skips the rollup trigger (already counted).
+                CREATE TEMP TABLE stranded_events ON COMMIT DROP AS
+                SELECT * FROM waste_events_default
+                WHERE detection_timestamp >= month_start AND detection_timestamp < month_end;
+                DELETE FROM waste_events_default
+                WHERE detection_timestamp >= month_start AND detection_timestamp < month_end;
+            END IF;
+
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF waste_events FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, month_end
+            );
+
+            IF stranded THEN
+                EXECUTE format(
+                    'INSERT INTO %I (event_id, device_id, detection_timestamp, duration_raw,
+                                     duration_interval, kwh_consumed, estimated_cost_php,
+                                     confidence_score, created_at)
+                     SELECT event_id, device_id, detection_timestamp, duration_raw,
+                            duration_interval, kwh_consumed, estimated_cost_php,
+                            confidence_score, created_at
+                     FROM stranded_events',
+                    part_name
+                );
+                DROP TABLE stranded_events;
+            END IF;
+            created := created + 1;
+        END IF;
+
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Retention: removes monthly partitions that ended more than retain_months
+-- months before the current month. With archive => TRUE they are detached
+-- into the waste_archive schema instead of dropped. Returns their names.
+CREATE OR REPLACE FUNCTION drop_waste_event_partitions(
+    retain_months INTEGER,
+    archive BOOLEAN DEFAULT FALSE
+) RETURNS SETOF TEXT AS $$
+DECLARE
+    cutoff TIMESTAMP :=
+        date_trunc('month', NOW() AT TIME ZONE 'UTC') - make_interval(months => retain_months);
+    part_name TEXT;
+BEGIN
+    FOR part_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'waste_events'::regclass
+          AND c.relname ~ '^waste_events_p[0-9]{4}_[0-9]{2}$'
+          AND to_date(substring(c.relname FROM 15), 'YYYY_MM') + INTERVAL '1 month' <= cutoff
+        ORDER BY c.relname
+    LOOP
+        IF archive THEN
+            CREATE SCHEMA IF NOT EXISTS waste_archive;
+            EXECUTE format('ALTER TABLE waste_events DETACH PARTITION %I', part_name);
+            EXECUTE format('ALTER TABLE %I SET SCHEMA waste_archive', part_name);
+        ELSE
+            EXECUTE format('DROP TABLE %I', part_name);
+        END IF;
+        RETURN NEXT part_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The past year (for backfills and generator.py) and the next three months
+SELECT ensure_waste_event_partitions(NOW() - INTERVAL '12 months');